@@ -0,0 +1,169 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+
+# Game logic imports
+from logic import generate_puzzle
+# Difficulty grading
+from grading import grade_puzzle
+from puzzle_id import SEED_BITS
+# Symmetric variants and repeat detection
+from symmetry import DedupeIndex, puzzle_variants
+# Binary puzzle store
+from store import PuzzleStore
+
+logger = logging.getLogger(__name__)
+
+'''
+Generate one puzzle inside a worker process
+board_size: size of the square board (N x N)
+seed: seed that pins down the puzzle (also encoded in its ID)
+grade: add the puzzle's graded "difficulty"
+output: puzzle dictionary
+'''
+def generate_seeded_puzzle(board_size: int, seed: int, grade: bool = False) -> dict:
+    puzzle = generate_puzzle(board_size, seed = seed)
+    if grade:
+        puzzle["difficulty"] = grade_puzzle(puzzle["regions"])["difficulty"]
+    return puzzle
+
+# Give up on --unique batches after this many repeats in a row (the size range has run out of puzzles)
+DUPLICATE_LIMIT = 1000
+
+'''
+Generate many puzzles across worker processes, yielding each one as soon as it's done
+count: number of puzzles to generate
+size_range: (smallest, largest) board size, inclusive
+workers: number of worker processes (defaults to one per CPU)
+seed: optional seed; the same seed always produces the same set of puzzles
+grade: grade every puzzle by the deductions it needs (adds "difficulty")
+variants: also yield every distinct rotation and reflection of each puzzle (up to 8 per generation);
+          which variants of the last puzzle make the count can depend on scheduling
+unique: skip puzzles that repeat an earlier one in any orientation or colouring (always on with variants)
+executor: optional process pool to run on (e.g. one a server shares between batches); otherwise the batch
+          starts its own pool of workers processes
+output: iterator of puzzle dictionaries in completion order (variants of a puzzle right after it)
+'''
+def generate_batch(count: int, size_range: tuple[int, int], workers: int | None = None,
+                   seed: int | None = None, grade: bool = False, variants: bool = False,
+                   unique: bool = False, executor: Executor | None = None) -> Iterator[dict]:
+    smallest, largest = size_range
+    if not 4 <= smallest <= largest:
+        raise ValueError("size_range must satisfy 4 <= smallest <= largest")
+
+    workers = workers or os.cpu_count() or 1
+    # Picks each puzzle's size and seed up front so results don't depend on scheduling
+    rng = random.Random(seed)
+    jobs = ((rng.randint(smallest, largest), rng.getrandbits(SEED_BITS)) for _ in itertools.count())
+
+    if not (variants or unique):
+        yield from _run_jobs(itertools.islice(jobs, count), workers, grade, executor)
+        return
+
+    # Jobs keep coming until enough new puzzles have been yielded
+    index = DedupeIndex()
+    produced = 0
+    repeats = 0
+    for puzzle in _run_jobs(jobs, workers, grade, executor):
+        if not index.add(puzzle["regions"]):
+            repeats += 1
+            if repeats >= DUPLICATE_LIMIT:
+                logger.warning("Stopping after %d repeated puzzles in a row", repeats)
+                return
+            continue
+        repeats = 0
+
+        for variant in puzzle_variants(puzzle) if variants else (puzzle,):
+            yield variant
+            produced += 1
+            if produced == count:
+                return
+
+# Run (size, seed) jobs on a process pool (a new one unless executor is given), yielding puzzles as they finish
+def _run_jobs(jobs: Iterable[tuple[int, int]], workers: int, grade: bool,
+              executor: Executor | None = None) -> Iterator[dict]:
+    if executor is None:
+        with ProcessPoolExecutor(max_workers = workers) as executor:
+            yield from _run_jobs(jobs, workers, grade, executor)
+        return
+
+    # Keep a few jobs queued per worker, but never the whole batch
+        # Memory stays flat no matter how large count is
+    in_flight = set()
+    try:
+        for size, job_seed in jobs:
+            in_flight.add(executor.submit(generate_seeded_puzzle, size, job_seed, grade))
+            if len(in_flight) < workers * 2:
+                continue
+
+            done, in_flight = wait(in_flight, return_when = FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+        # Drain whatever is still running
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when = FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        # Caller stopped early, so don't wait on queued jobs nobody will read
+        for future in in_flight:
+            future.cancel()
+
+'''
+Parse a size range such as "4-10" or "8"
+text: range given on the command line
+output: (smallest, largest) board size
+'''
+def parse_size_range(text: str) -> tuple[int, int]:
+    smallest, _, largest = text.partition("-")
+    return int(smallest), int(largest or smallest)
+
+# Pass puzzles through, printing progress every 100
+def with_progress(puzzles: Iterator[dict], count: int) -> Iterator[dict]:
+    for done, puzzle in enumerate(puzzles, start = 1):
+        yield puzzle
+        if done % 100 == 0 or done == count:
+            print(f"{done}/{count} puzzles written", file = sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Generate a batch of puzzles and write them to disk")
+    parser.add_argument("--count", type = int, required = True, help = "number of puzzles")
+    parser.add_argument("--sizes", type = parse_size_range, default = (4, 10), help = "board sizes, e.g. 4-10")
+    parser.add_argument("--workers", type = int, default = None, help = "worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type = int, default = None, help = "seed for a repeatable batch")
+    parser.add_argument("--grade", action = "store_true", help = "grade each puzzle's difficulty by the deductions it needs")
+    parser.add_argument("--variants", action = "store_true",
+                        help = "also write every rotation and reflection of each puzzle (up to 8 per generation, no repeats)")
+    parser.add_argument("--unique", action = "store_true", help = "skip puzzles that repeat an earlier one in any orientation")
+    parser.add_argument("--output", "-o", required = True, help = "file to write")
+    parser.add_argument("--format", choices = ["ndjson", "store"], default = "ndjson",
+                        help = "ndjson: one JSON puzzle per line; store: append to a binary puzzle store")
+    args = parser.parse_args()
+
+    # Library warnings (e.g. a --unique batch running out of puzzles) go to stderr
+    logging.basicConfig(level = logging.WARNING, format = "%(message)s")
+
+    puzzles = with_progress(generate_batch(args.count, args.sizes, args.workers, args.seed, args.grade,
+                                               args.variants, args.unique), args.count)
+
+    if args.format == "store":
+        store = PuzzleStore(args.output)
+        try:
+            store.extend(puzzles)
+        finally:
+            store.close()
+        return
+
+    with open(args.output, "w") as out:
+        for puzzle in puzzles:
+            out.write(json.dumps(puzzle, separators = (",", ":")) + "\n")
+
+if __name__ == "__main__":
+    main()
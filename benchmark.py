@@ -0,0 +1,432 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+# Game logic imports
+from logic import generate_queen_solution, generate_regions, carve_regions, find_queen_solutions
+from solver import enumerate_solutions
+from placement import SOLUTION_GENERATORS
+
+# Pipeline stages timed separately, in the order generate_puzzle runs them
+STAGES = ["generate_queen_solution", "generate_regions", "carve_regions", "find_queen_solutions"]
+# Per-puzzle counters reported alongside the timings
+COUNTERS = ["carve_attempts", "regenerations", "solver_nodes", "full_searches", "cell_searches"]
+
+'''
+Previous set-based backtracking solver, kept as the baseline for solver benchmarks
+region_board: 2D list of integers where region_board[row][col] = region_id
+output: A list of solutions, where each solution maps (row, column): solution[row] = column
+'''
+def find_queen_solutions_sets(region_board: list[list[int]]) -> list[list[int]]:
+    n = len(region_board)
+
+    # Dictionary mapping region ID to a list of board cells (row, col) in that region
+        # Prepares empty list for each region ID (fill with (row, col) coordinates belonging to that region)
+    region_cells = {region_id: [] for region_id in range(n)}
+
+    # Populate region's list with all cells in it
+    for row in range(n):
+        for col in range(n):
+            # Read the region ID of a cell
+            region = region_board[row][col]
+            # Add the cell to its respective list at region position in dictionary
+            region_cells[region].append((row, col))
+
+    # Sort regions by size of cell lists (ascending)
+        # Small cells sorted first (MRV heuristic)
+        # Try most constrained regions first to prune faster
+    region_order = sorted(region_cells, key = lambda r: len(region_cells[r]))
+
+    # Track which constraints are already used
+        # Avoid row, column, and diagonal conflicts
+    used_rows = set()
+    used_cols = set()
+    used_diagLR = set()
+    used_diagRL = set()
+    # Hold cells for each region as partial assignements built
+        # Maps region_id to (row, col)
+    queen_in_region = {}
+    # keep track of solutions found (up to 2 solutions)
+    solutions = []
+
+    # Recursive constraint satisfaction problem (CSP) solver
+        # region_index: which region in region_order we're assigning next
+    def backtrack(region_index):
+        # Only care if there's > 1 solution
+            # Saves work to leave early
+        if len(solutions) >= 2:
+            return
+        
+        # All regions assigned one queen
+        if region_index == n:
+            # Build row -> col list
+            board_row_to_col = [-1] * n
+
+            # Loop through region ids
+            for region_id, (row, col) in queen_in_region.items():
+                # Store column of queen placement in row position of list
+                board_row_to_col[row] = col
+
+            # Add to solutions
+            solutions.append(board_row_to_col)
+            #print(f"Found Solution: {board_row_to_col}")
+            return
+        
+        # Next region ID to place
+        current_region = region_order[region_index]
+        #print(f"Trying to place queen for region {current_region} (index {region_index})")
+
+        # Loop through all possible cell (row, col) slots
+        for (row, col) in region_cells[current_region]:
+            # Placement invalid (conflict with another queen) so skip
+            if (row in used_rows or col in used_cols or
+                (row + col) in used_diagLR or (row - col) in used_diagRL):
+                continue
+
+            # Add queen to that position
+                # Mark all constraints used and record placement
+            used_rows.add(row)
+            used_cols.add(col)
+            used_diagLR.add(row + col)
+            used_diagRL.add(row - col)
+            queen_in_region[current_region] = (row, col)
+
+            # Recurse to fill next region
+            backtrack(region_index + 1)
+
+            # Backtrack (undo) the move
+            used_rows.remove(row)
+            used_cols.remove(col)
+            used_diagLR.remove(row + col)
+            used_diagRL.remove(row - col)
+            del queen_in_region[current_region]
+
+            # Early stopping (2 solutions found)
+            if len(solutions) >= 2:
+                return
+
+    # Call backtrack starting at row 0
+    backtrack(0)
+    #print(f"find_queen_solutions: returning {len(solutions)} solution(s)")
+    return solutions
+
+'''
+Parse a size range such as "4-16" or "9"
+text: range given on the command line
+output: list of board sizes in the range (inclusive)
+'''
+def parse_sizes(text: str) -> list[int]:
+    smallest, _, largest = text.partition("-")
+    return list(range(int(smallest), int(largest or smallest) + 1))
+
+'''
+Build region boards to benchmark against
+board_size: size of the square board (N x N)
+count: number of boards to build
+seed: seed for the global random module so runs are repeatable
+carved: carve the boards first (a near-unique board is the common case in /generate)
+output: list of region boards
+'''
+def build_boards(board_size: int, count: int, seed: int, carved: bool) -> list[list[list[int]]]:
+    random.seed(seed * 1000 + board_size)
+    boards = []
+    for _ in range(count):
+        solution = generate_queen_solution(board_size)
+        regions = generate_regions(solution, board_size)
+        if carved:
+            regions = carve_regions(solution, regions)
+        boards.append(regions)
+    return boards
+
+'''
+Time one solver over a list of boards
+solve: solver function taking a region board
+boards: list of region boards
+output: (list of per-board times in seconds, list of solution counts)
+'''
+def time_solver(solve, boards: list[list[list[int]]]) -> tuple[list[float], list[int]]:
+    times = []
+    counts = []
+    for board in boards:
+        start = time.perf_counter()
+        solutions = solve(board)
+        times.append(time.perf_counter() - start)
+        counts.append(len(solutions))
+    return times, counts
+
+'''
+Compare the bitboard solver with the set-based baseline for every size
+args: parsed command-line arguments
+'''
+def bench_solver(args) -> None:
+    print(f"{'size':>4} {'boards':>6} {'sets ms':>10} {'bitboard ms':>12} {'speedup':>8}")
+
+    for size in parse_sizes(args.sizes):
+        boards = build_boards(size, args.boards, args.seed, args.carved)
+
+        old_times, old_counts = time_solver(find_queen_solutions_sets, boards)
+        new_times, new_counts = time_solver(lambda board: enumerate_solutions(board, limit=2), boards)
+
+        # Both solvers must agree on "none / unique / more than one"
+        if old_counts != new_counts:
+            raise SystemExit(f"solvers disagree on {size}x{size} boards: {old_counts} vs {new_counts}")
+
+        old_ms = statistics.mean(old_times) * 1000
+        new_ms = statistics.mean(new_times) * 1000
+        print(f"{size:>4} {len(boards):>6} {old_ms:>10.3f} {new_ms:>12.3f} {old_ms / new_ms:>7.1f}x")
+
+'''
+Time the exact-cover counter test.py cross-checks against, next to a full count by the bitboard solver
+args: parsed command-line arguments (exits 1 if a size's mean goes over --budget-ms)
+'''
+def bench_exact_cover(args) -> None:
+    # test.py is a script next to this one
+    from test import count_solutions_exact_cover
+
+    print(f"{'size':>4} {'boards':>6} {'exact cover ms':>15} {'max ms':>9} {'bitboard ms':>12}")
+    over_budget = 0
+    for size in parse_sizes(args.sizes):
+        boards = build_boards(size, args.boards, args.seed, args.carved)
+
+        cover_times = []
+        cover_counts = []
+        for board in boards:
+            start = time.perf_counter()
+            cover_counts.append(count_solutions_exact_cover(board, size))
+            cover_times.append(time.perf_counter() - start)
+        solver_times, solver_counts = time_solver(lambda board: enumerate_solutions(board, limit = sys.maxsize), boards)
+
+        if cover_counts != solver_counts:
+            raise SystemExit(f"counts disagree on {size}x{size} boards: {cover_counts} vs {solver_counts}")
+
+        mean_ms = statistics.mean(cover_times) * 1000
+        flag = ""
+        if args.budget_ms is not None and mean_ms > args.budget_ms:
+            flag = "  OVER BUDGET"
+            over_budget += 1
+        print(f"{size:>4} {len(boards):>6} {mean_ms:>15.3f} {max(cover_times) * 1000:>9.3f} "
+              f"{statistics.mean(solver_times) * 1000:>12.3f}{flag}")
+
+    if over_budget:
+        sys.exit(1)
+
+'''
+Time every N-Queens solution generator for every size
+args: parsed command-line arguments
+'''
+def bench_placement(args) -> None:
+    methods = args.methods.split(",")
+    print(f"{'size':>5} " + " ".join(f"{method + ' ms':>18} {'max ms':>9}" for method in methods))
+
+    for size in parse_sizes(args.sizes):
+        row = f"{size:>5} "
+        for method in methods:
+            generate = SOLUTION_GENERATORS[method]
+            rng = random.Random(args.seed * 1000 + size)
+            times = []
+            for _ in range(args.solutions):
+                start = time.perf_counter()
+                solution = generate(size, rng)
+                times.append(time.perf_counter() - start)
+
+                # Every column and diagonal used exactly once
+                if (solution is None or sorted(solution) != list(range(size))
+                        or len({r + c for r, c in enumerate(solution)}) != size
+                        or len({r - c for r, c in enumerate(solution)}) != size):
+                    raise SystemExit(f"{method} returned an invalid {size}x{size} solution: {solution}")
+
+            row += f"{statistics.mean(times) * 1000:>18.3f} {max(times) * 1000:>9.3f} "
+        print(row)
+
+'''
+Value at a percentile (nearest rank)
+values: numbers to summarize
+percent: percentile between 0 and 100
+'''
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+'''
+Summary statistics for one measurement
+values: one number per puzzle
+output: dictionary with mean, p50, p90, p99, and max
+'''
+def summarize(values: list[float]) -> dict:
+    return {
+        "mean": statistics.mean(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+'''
+Build one puzzle the way generate_puzzle does, timing each stage
+board_size: size of the square board (N x N)
+seed: seed for the puzzle's random number generator
+output: (seconds spent in each stage, counters for the puzzle)
+'''
+def profile_puzzle(board_size: int, seed: int) -> tuple[dict, dict]:
+    rng = random.Random(seed)
+    timings = {stage: 0.0 for stage in STAGES}
+    stats = {}
+    regenerations = -1
+
+    # Same loop as generate_puzzle, with a timer around every call
+    while True:
+        regenerations += 1
+
+        start = time.perf_counter()
+        solution = generate_queen_solution(board_size, rng)
+        timings["generate_queen_solution"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        regions = generate_regions(solution, board_size, rng)
+        timings["generate_regions"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        carved = carve_regions(solution, regions, stats=stats)
+        timings["carve_regions"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        unique = len(find_queen_solutions(carved, stats=stats)) < 2
+        timings["find_queen_solutions"] += time.perf_counter() - start
+
+        if unique:
+            break
+
+    counters = {
+        "carve_attempts": stats.get("carve_attempts", 0),
+        "regenerations": regenerations,
+        "solver_nodes": stats.get("nodes", 0),
+        "full_searches": stats.get("full_searches", 0),
+        "cell_searches": stats.get("cell_searches", 0),
+    }
+    return timings, counters
+
+'''
+Time every pipeline stage for every size and write the results as JSON
+args: parsed command-line arguments
+'''
+def bench_pipeline(args) -> None:
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": args.seed,
+            "puzzles": args.puzzles,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "sizes": {},
+    }
+
+    print(f"{'size':>4} " + " ".join(f"{stage + ' p50 ms':>30}" for stage in STAGES))
+    for size in parse_sizes(args.sizes):
+        timings = {stage: [] for stage in STAGES}
+        counters = {counter: [] for counter in COUNTERS}
+
+        for index in range(args.puzzles):
+            puzzle_timings, puzzle_counters = profile_puzzle(size, args.seed * 1_000_000 + size * 1000 + index)
+            for stage in STAGES:
+                timings[stage].append(puzzle_timings[stage] * 1000)
+            for counter in COUNTERS:
+                counters[counter].append(puzzle_counters[counter])
+
+        # Milliseconds per puzzle for stages, raw counts for counters
+        results["sizes"][str(size)] = {
+            **{f"{stage}_ms": summarize(values) for stage, values in timings.items()},
+            **{counter: summarize(values) for counter, values in counters.items()},
+        }
+        print(f"{size:>4} " + " ".join(f"{percentile(timings[stage], 50):>30.3f}" for stage in STAGES))
+
+    with open(args.output, "w") as out:
+        json.dump(results, out, indent = 2)
+    print(f"Results written to {args.output}")
+
+'''
+Compare two pipeline result files and flag regressions
+args: parsed command-line arguments (exits with status 1 if anything regressed)
+'''
+def bench_compare(args) -> None:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = 0
+    print(f"{'size':>4} {'metric':<30} {'baseline':>12} {'current':>12} {'change':>8}")
+    for size, metrics in current["sizes"].items():
+        if size not in baseline["sizes"]:
+            continue
+
+        for metric, summary in metrics.items():
+            before = baseline["sizes"][size].get(metric, {}).get(args.stat)
+            after = summary[args.stat]
+            if not before:
+                continue
+
+            change = (after - before) / before
+            flag = ""
+            if change > args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{size:>4} {metric:<30} {before:>12.3f} {after:>12.3f} {change:>+7.0%}{flag}")
+
+    if regressions:
+        print(f"{regressions} metric(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmarks for puzzle generation")
+    commands = parser.add_subparsers(dest = "command", required = True)
+
+    solver_parser = commands.add_parser("solver", help = "compare the bitboard solver with the set-based baseline")
+    solver_parser.add_argument("--sizes", default = "4-16", help = "board sizes, e.g. 4-16")
+    solver_parser.add_argument("--boards", type = int, default = 20, help = "boards per size")
+    solver_parser.add_argument("--seed", type = int, default = 0, help = "seed for board generation")
+    solver_parser.add_argument("--carved", action = "store_true", help = "carve boards before timing")
+    solver_parser.set_defaults(run = bench_solver)
+
+    cover_parser = commands.add_parser("exact-cover", help = "time the exact-cover solution counter used by test.py")
+    cover_parser.add_argument("--sizes", default = "4-16", help = "board sizes, e.g. 4-16")
+    cover_parser.add_argument("--boards", type = int, default = 10, help = "boards per size")
+    cover_parser.add_argument("--seed", type = int, default = 0, help = "seed for board generation")
+    cover_parser.add_argument("--carved", action = "store_true", help = "carve boards before timing")
+    cover_parser.add_argument("--budget-ms", type = float, default = None, help = "exit 1 if a size's mean time is over this")
+    cover_parser.set_defaults(run = bench_exact_cover)
+
+    placement_parser = commands.add_parser("placement", help = "compare the N-Queens solution generators")
+    placement_parser.add_argument("--sizes", default = "8-32", help = "board sizes, e.g. 8-32 or 1000")
+    placement_parser.add_argument("--solutions", type = int, default = 20, help = "solutions per size")
+    placement_parser.add_argument("--methods", default = ",".join(SOLUTION_GENERATORS),
+                                  help = "comma-separated generators (backtracking is impractical past ~40)")
+    placement_parser.add_argument("--seed", type = int, default = 0, help = "seed for the generators")
+    placement_parser.set_defaults(run = bench_placement)
+
+    pipeline_parser = commands.add_parser("pipeline", help = "time each generation stage and write JSON results")
+    pipeline_parser.add_argument("--sizes", default = "4-14", help = "board sizes, e.g. 4-14")
+    pipeline_parser.add_argument("--puzzles", type = int, default = 30, help = "puzzles per size")
+    pipeline_parser.add_argument("--seed", type = int, default = 0, help = "base seed (fixed seeds keep runs comparable)")
+    pipeline_parser.add_argument("--output", "-o", default = "bench_pipeline.json", help = "JSON file to write")
+    pipeline_parser.set_defaults(run = bench_pipeline)
+
+    compare_parser = commands.add_parser("compare", help = "compare two pipeline result files")
+    compare_parser.add_argument("baseline", help = "earlier results (JSON)")
+    compare_parser.add_argument("current", help = "new results (JSON)")
+    compare_parser.add_argument("--stat", default = "p50", choices = ["mean", "p50", "p90", "p99", "max"],
+                                help = "statistic to compare")
+    compare_parser.add_argument("--threshold", type = float, default = 0.2,
+                                help = "relative increase reported as a regression (0.2 = 20%%)")
+    compare_parser.set_defaults(run = bench_compare)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
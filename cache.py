@@ -0,0 +1,38 @@
+import threading
+from collections import OrderedDict
+
+'''
+Least-recently-used cache with a fixed number of entries
+max_entries: oldest entries are dropped past this many
+'''
+class LRUCache:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Sync endpoints run on the threadpool, so guard reordering
+        self._lock = threading.Lock()
+
+    '''
+    Look up an entry and mark it as recently used
+    output: cached value, or default if missing
+    '''
+    def get(self, key, default = None):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return default
+            return self._entries[key]
+
+    '''
+    Add or replace an entry, dropping the least recently used one if full
+    '''
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last = False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
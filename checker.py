@@ -0,0 +1,57 @@
+from collections.abc import Iterable
+
+'''
+Find queen conflicts on a board in one pass
+board: 2D list where each cell is empty (0) or has a queen (1)
+regions: 2D list of region IDs, same shape as board
+output: (win, conflicts) where win is True when every region has one queen and nothing conflicts,
+        and conflicts lists [row, col] of each queen breaking a rule (row-major order)
+'''
+def check_board(board: list[list[int]], regions: list[list[int]]) -> tuple[bool, list[list[int]]]:
+    n = len(board)
+
+    # Queens on each row, column, and diagonal
+        # L -> R diagonals share row + col, R -> L diagonals share row - col
+    row_count = [0] * n
+    col_count = [0] * n
+    diag_lr_count = [0] * (2 * n - 1)
+    diag_rl_count = [0] * (2 * n - 1)
+    # Queens found so far (row-major order)
+    queens = []
+
+    for row, board_row in enumerate(board):
+        for col, cell in enumerate(board_row):
+            if cell == 1:
+                queens.append((row, col))
+                row_count[row] += 1
+                col_count[col] += 1
+                diag_lr_count[row + col] += 1
+                diag_rl_count[row - col + n - 1] += 1
+
+    # Regions that already have a queen
+    region_seen = set()
+    conflicts = []
+
+    for row, col in queens:
+        region = regions[row][col]
+
+        # Any shared line means this queen is attacked
+            # A repeated region only flags the queens after the first
+        if (row_count[row] > 1 or col_count[col] > 1 or
+            diag_lr_count[row + col] > 1 or diag_rl_count[row - col + n - 1] > 1 or
+            region in region_seen):
+            conflicts.append([row, col])
+
+        region_seen.add(region)
+
+    # No conflicts and all queens placed
+    win = len(region_seen) == n and not conflicts
+    return win, conflicts
+
+'''
+Check many boards in one call (replays and anti-cheat jobs)
+submissions: iterable of (board, regions) pairs
+output: list of (win, conflicts) results in the same order
+'''
+def check_boards(submissions: Iterable[tuple[list[list[int]], list[list[int]]]]) -> list[tuple[bool, list[list[int]]]]:
+    return [check_board(board, regions) for board, regions in submissions]
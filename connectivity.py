@@ -0,0 +1,138 @@
+from functools import lru_cache
+
+'''
+Up, down, left, and right neighbors of every cell
+board_size: size of the square board (N x N)
+output: tuple where index = row * N + col and value = tuple of neighbor cell numbers
+'''
+@lru_cache(maxsize = None)
+def neighbor_cells(board_size: int) -> tuple[tuple[int, ...], ...]:
+    n = board_size
+    neighbors = []
+    for row in range(n):
+        for col in range(n):
+            cell_neighbors = []
+            for d_row, d_col in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                neighbor_row = row + d_row
+                neighbor_col = col + d_col
+                # Ensure neighbor cell inside board
+                if 0 <= neighbor_row < n and 0 <= neighbor_col < n:
+                    cell_neighbors.append(neighbor_row * n + neighbor_col)
+            neighbors.append(tuple(cell_neighbors))
+    return tuple(neighbors)
+
+'''
+Find the cells that hold a region together (articulation points) with Tarjan's algorithm
+cells: set of cell numbers (row * N + col) in one region
+board_size: size of the square board (N x N)
+output: set of cells whose removal splits the region, or None if the region is already split
+'''
+def find_cut_cells(cells: set[int], board_size: int) -> set[int] | None:
+    neighbors = neighbor_cells(board_size)
+    root = next(iter(cells))
+
+    # Discovery time and lowest reachable discovery time of each visited cell
+    discovered = {root: 0}
+    low = {root: 0}
+    cut_cells = set()
+    root_children = 0
+
+    # Iterative DFS: (cell, parent cell, iterator over its neighbors)
+    stack = [(root, -1, iter(neighbors[root]))]
+    while stack:
+        cell, parent, pending = stack[-1]
+
+        for neighbor in pending:
+            # Only walk inside the region
+            if neighbor not in cells:
+                continue
+
+            # Tree edge: descend into the neighbor
+            if neighbor not in discovered:
+                discovered[neighbor] = low[neighbor] = len(discovered)
+                stack.append((neighbor, cell, iter(neighbors[neighbor])))
+                break
+
+            # Back edge: cell can reach an earlier cell without its parent
+            if neighbor != parent:
+                low[cell] = min(low[cell], discovered[neighbor])
+
+        # Every neighbor done, so hand the low value back to the parent
+        else:
+            stack.pop()
+            if parent == -1:
+                continue
+
+            low[parent] = min(low[parent], low[cell])
+            if parent == root:
+                root_children += 1
+            # Cell's subtree can't get above the parent without it
+            elif low[cell] >= discovered[parent]:
+                cut_cells.add(parent)
+
+    # Root is only a cut cell if the DFS had to branch from it
+    if root_children > 1:
+        cut_cells.add(root)
+
+    # Some cells weren't reachable, so the region is already split
+    if len(discovered) != len(cells):
+        return None
+
+    return cut_cells
+
+'''
+Connectivity index of every region on a board, kept up to date as cells move
+
+Replaces scanning the board and running a DFS for each "can this cell leave its region?" probe.
+Each region's cut cells are cached and only recomputed for the two regions a move touches.
+
+region_board: 2D grid where each cell is a region ID (read once; moves go through move())
+'''
+class RegionIndex:
+    def __init__(self, region_board: list[list[int]]):
+        self.board_size = len(region_board)
+
+        # Region ID of each cell (row * N + col)
+        self._region_of = [region for row in region_board for region in row]
+        # Cells in each region
+        self._cells = {}
+        for cell, region in enumerate(self._region_of):
+            self._cells.setdefault(region, set()).add(cell)
+        # Cached cut cells for each region (missing = needs recomputing)
+        self._cut_cells = {}
+
+    '''
+    Sees if a cell can leave its region without splitting it
+    row, col: cell to check
+    output: True if the rest of the region stays 4-connected; otherwise False
+    '''
+    def can_leave(self, row: int, col: int) -> bool:
+        cell = row * self.board_size + col
+        region = self._region_of[cell]
+
+        # Last cell of a region can't leave
+        if len(self._cells[region]) <= 1:
+            return False
+
+        if region not in self._cut_cells:
+            self._cut_cells[region] = find_cut_cells(self._cells[region], self.board_size)
+
+        cut_cells = self._cut_cells[region]
+        return cut_cells is not None and cell not in cut_cells
+
+    '''
+    Record a cell moving into another region
+    row, col: cell that moved
+    region_id: region the cell joined
+    '''
+    def move(self, row: int, col: int, region_id: int) -> None:
+        cell = row * self.board_size + col
+        old_region = self._region_of[cell]
+
+        self._region_of[cell] = region_id
+        self._cells[old_region].discard(cell)
+        self._cells.setdefault(region_id, set()).add(cell)
+
+        # Only the two regions involved need new cut cells
+        self._cut_cells.pop(old_region, None)
+        self._cut_cells.pop(region_id, None)
@@ -0,0 +1,175 @@
+import argparse
+import os
+import sys
+import time
+from collections.abc import Iterator
+from concurrent.futures import Executor
+
+import httpx
+
+# Puzzles generated on the fly across worker processes
+from batch import generate_batch, parse_size_range
+# JSON encoding shared with the API
+from responses import dumps
+# Binary packs use the puzzle store's file layout
+from store import HEADER, MAGIC, VERSION, RECORD_SIZE, MAX_SIZE, PuzzleStore, decode_puzzle, encode_puzzle
+
+'''
+Puzzle packs: many puzzles as one stream, for partners and offline apps
+
+ndjson: one JSON puzzle per line (id, size, solution, regions, and difficulty when graded)
+binary: a puzzle store file (store.py header, then fixed-size records), so a saved pack opens with PuzzleStore
+
+Packs are built chunk by chunk from a generator, so memory stays flat however many puzzles are asked for.
+Served by GET /export (see main.py) and written locally or downloaded with this CLI:
+
+python export.py --count 100000 --sizes 4-10 --format binary -o pack.qpz
+python export.py --url http://127.0.0.1:8000 --token "$EXPORT_TOKEN" --count 100000 -o pack.ndjson
+'''
+
+FORMATS = ("ndjson", "binary")
+# auto: stored puzzles first, then generate the rest; store: stored only; generate: generated only
+SOURCES = ("auto", "store", "generate")
+
+# Puzzles joined into one chunk of the stream
+CHUNK_PUZZLES = 256
+# Generated puzzles trickle in, so a partial chunk goes out after this many seconds
+FLUSH_SECONDS = 0.5
+
+'''
+Check pack options before any bytes are sent (raises ValueError)
+count: number of puzzles
+size_range: (smallest, largest) board size, inclusive
+fmt: one of FORMATS
+source: one of SOURCES
+store: PuzzleStore to draw from, or None
+'''
+def validate_pack(count: int, size_range: tuple[int, int], fmt: str, source: str,
+                  store: PuzzleStore | None) -> None:
+    smallest, largest = size_range
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    if not 4 <= smallest <= largest <= MAX_SIZE:
+        raise ValueError(f"sizes must satisfy 4 <= smallest <= largest <= {MAX_SIZE}")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if source not in SOURCES:
+        raise ValueError(f"source must be one of {', '.join(SOURCES)}")
+    if source == "store":
+        if store is None:
+            raise ValueError("no puzzle store to export from")
+        if not any(smallest <= size <= largest for size, stored in store.counts().items() if stored):
+            raise ValueError("no stored puzzles in that size range")
+
+'''
+Build a puzzle pack as a stream of byte chunks
+count, size_range, fmt, source, store: as for validate_pack
+workers: worker processes for generated puzzles (defaults to one per CPU)
+seed: optional seed so the generated part of the pack is repeatable
+grade: grade generated puzzles (adds "difficulty")
+executor: optional process pool for generated puzzles (see generate_batch); workers still sets how many jobs are queued
+output: iterator of bytes; a "store" source ends early if the store runs out
+'''
+def iter_pack(count: int, size_range: tuple[int, int], fmt: str = "ndjson", source: str = "auto",
+              store: PuzzleStore | None = None, workers: int | None = None, seed: int | None = None,
+              grade: bool = False, executor: Executor | None = None) -> Iterator[bytes]:
+    validate_pack(count, size_range, fmt, source, store)
+    binary = fmt == "binary"
+
+    if binary:
+        yield HEADER.pack(MAGIC, VERSION, RECORD_SIZE)
+
+    chunk = []
+    flushed = time.monotonic()
+    remaining = count
+
+    # Stored records go out as they are (binary) or decoded once (ndjson)
+    if source != "generate" and store is not None:
+        for record in store.scan(size_range):
+            if remaining == 0:
+                break
+            chunk.append(record if binary else dumps(decode_puzzle(record)) + b"\n")
+            remaining -= 1
+
+            if len(chunk) == CHUNK_PUZZLES:
+                yield b"".join(chunk)
+                chunk = []
+        flushed = time.monotonic()
+
+    # Rest generated in parallel; only a few jobs are queued at a time, so nothing runs ahead of the reader
+    if source != "store" and remaining:
+        for puzzle in generate_batch(remaining, size_range, workers, seed, grade, executor = executor):
+            chunk.append(encode_puzzle(puzzle).ljust(RECORD_SIZE, b"\0") if binary else dumps(puzzle) + b"\n")
+
+            if len(chunk) == CHUNK_PUZZLES or time.monotonic() - flushed >= FLUSH_SECONDS:
+                yield b"".join(chunk)
+                chunk = []
+                flushed = time.monotonic()
+
+    if chunk:
+        yield b"".join(chunk)
+
+# Download a pack from a running server's /export into a file
+def download(args) -> int:
+    params = {"count": args.count, "sizes": f"{args.sizes[0]}-{args.sizes[1]}", "format": args.format,
+              "source": args.source, "grade": str(args.grade).lower()}
+    if args.seed is not None:
+        params["seed"] = args.seed
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+
+    written = 0
+    with httpx.stream("GET", args.url.rstrip("/") + "/export", params = params, headers = headers,
+                      timeout = httpx.Timeout(30, read = None)) as response:
+        if response.status_code != 200:
+            response.read()
+            raise SystemExit(f"export failed with HTTP {response.status_code}: {response.text}")
+
+        with open(args.output, "wb") as out:
+            for data in response.iter_bytes():
+                out.write(data)
+                written += len(data)
+    return written
+
+# Build a pack in this process (from a local store and/or worker processes) into a file
+def build(args) -> int:
+    store = PuzzleStore(args.store) if args.store else None
+    written = 0
+    # Bad options fail before the output file is created
+    validate_pack(args.count, args.sizes, args.format, args.source, store)
+    try:
+        with open(args.output, "wb") as out:
+            for data in iter_pack(args.count, args.sizes, args.format, args.source, store,
+                                  args.workers, args.seed, args.grade):
+                out.write(data)
+                written += len(data)
+    finally:
+        if store is not None:
+            store.close()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description = "Write a puzzle pack (NDJSON or a binary puzzle store)")
+    parser.add_argument("--count", type = int, required = True, help = "number of puzzles")
+    parser.add_argument("--sizes", type = parse_size_range, default = (4, 10), help = "board sizes, e.g. 4-10")
+    parser.add_argument("--format", choices = FORMATS, default = "ndjson", help = "ndjson lines or a binary puzzle store")
+    parser.add_argument("--source", choices = SOURCES, default = "auto",
+                        help = "auto: stored puzzles first, then generated; store: stored only; generate: generated only")
+    parser.add_argument("--output", "-o", required = True, help = "file to write")
+    parser.add_argument("--url", default = None, help = "download from this server's /export instead of building locally")
+    parser.add_argument("--token", default = os.environ.get("EXPORT_TOKEN"), help = "export token for --url (default EXPORT_TOKEN)")
+    parser.add_argument("--store", default = None, help = "local puzzle store to draw from (without --url)")
+    parser.add_argument("--workers", type = int, default = None, help = "worker processes for generated puzzles (without --url)")
+    parser.add_argument("--seed", type = int, default = None, help = "seed for a repeatable generated part")
+    parser.add_argument("--grade", action = "store_true", help = "grade generated puzzles by the deductions they need")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        written = download(args) if args.url else build(args)
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+    print(f"{written} bytes written to {args.output} in {time.perf_counter() - start:.1f} s", file = sys.stderr)
+
+if __name__ == "__main__":
+    main()
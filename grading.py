@@ -0,0 +1,367 @@
+import copy
+from functools import lru_cache
+from itertools import combinations
+
+# Attack masks per board size
+from solver import line_masks, region_masks
+
+'''
+Human-style deduction on bitmasks, used to grade puzzles and give hints
+
+Each row, column, and region is a "unit" needing exactly one queen. The engine keeps one mask of
+cells that can still hold a queen and applies the rules below, always trying the easiest first.
+A puzzle's grade is the hardest rule it needs; one the rules can't finish needs guessing ("search").
+'''
+
+# Deduction rules from easiest to hardest (level = position + 1)
+    # single: a unit has one cell left, so the queen goes there
+    # confinement: a unit's cells all sit in one other unit, so that unit's other cells are out
+    # elimination: a queen on a cell would leave some unit with no cells, so the cell is out
+    # pair / triple: two (three) units' cells all sit in two (three) units of another kind,
+    #               so those units' other cells are out
+    # chain: a queen on a cell forces singles that leave some unit with no cells, so the cell is out
+RULES = ("single", "confinement", "elimination", "pair", "triple", "chain")
+# Level of a puzzle the rules can't finish
+SEARCH_LEVEL = len(RULES) + 1
+
+# Puzzle difficulty by hardest rule needed (same names as the difficulty bands)
+DIFFICULTIES = ("easy", "medium", "hard")
+
+'''
+Difficulty name for a grade level
+level: hardest rule level needed (SEARCH_LEVEL if the rules can't finish)
+output: "easy" (up to elimination), "medium" (pairs and triples), or "hard" (chains or guessing)
+'''
+def difficulty_for_level(level: int) -> str:
+    if level <= RULES.index("elimination") + 1:
+        return "easy"
+    if level <= RULES.index("triple") + 1:
+        return "medium"
+    return "hard"
+
+'''
+Unit tables that only depend on the board size
+board_size: size of the square board (N x N)
+output: (row of each cell, column of each cell)
+'''
+@lru_cache(maxsize = None)
+def cell_tables(board_size: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    n = board_size
+    rows = tuple(cell // n for cell in range(n * n))
+    cols = tuple(cell % n for cell in range(n * n))
+    return rows, cols
+
+# Cell numbers in a mask (lowest first)
+def _cells(mask: int) -> list[int]:
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
+
+# "a", "a and b", "a, b, and c"
+def _join(names) -> str:
+    names = list(names)
+    if len(names) < 3:
+        return " and ".join(names)
+    return ", ".join(names[:-1]) + ", and " + names[-1]
+
+'''
+Candidate masks and placed queens for one board, changed one deduction at a time
+regions: 2D list of region IDs
+'''
+class Deduction:
+    def __init__(self, regions: list[list[int]]):
+        n = len(regions)
+        self.n = n
+        row_masks, col_masks, self.attacks = line_masks(n)
+        self.region_of, region_unit_masks = region_masks(regions)
+        self.rows, self.cols = cell_tables(n)
+        # Region, row, and column unit of each cell
+        self.cell_units = [(self.region_of[cell], n + self.rows[cell], 2 * n + self.cols[cell])
+                           for cell in range(n * n)]
+
+        # Units 0..n-1 are regions, n..2n-1 rows, 2n..3n-1 columns
+        self.units = region_unit_masks + list(row_masks) + list(col_masks)
+        # Cells a queen on each cell blocks (its lines and its region)
+        self.blocks = [self.attacks[cell] | region_unit_masks[self.region_of[cell]] for cell in range(n * n)]
+        # Units touched by a mask of cells (see _touched)
+        self._touched_memo = {}
+        # Cells that can still hold a queen
+        self.candidates = (1 << (n * n)) - 1
+        # Cells holding a queen
+        self.queens = 0
+        # Units without a queen yet
+        self.open_units = set(range(3 * n))
+
+    '''
+    Same board with every cell open again (shares the board tables, so it's cheap per request)
+    The _touched memo isn't shared, so a cached board's memory doesn't grow with every request on it.
+    '''
+    def fresh(self) -> "Deduction":
+        clone = copy.copy(self)
+        clone._touched_memo = {}
+        clone.candidates = (1 << (self.n * self.n)) - 1
+        clone.queens = 0
+        clone.open_units = set(range(3 * self.n))
+        return clone
+
+    '''
+    Put a queen on a cell (blocks its lines and region)
+    '''
+    def place(self, cell: int) -> None:
+        self.queens |= 1 << cell
+        self.candidates &= ~self.blocks[cell]
+        self.open_units.difference_update(self.cell_units[cell])
+
+    '''
+    Rule out cells
+    mask: cells that can't hold a queen
+    '''
+    def eliminate(self, mask: int) -> None:
+        self.candidates &= ~mask
+
+    '''
+    True once every unit has its queen
+    '''
+    @property
+    def solved(self) -> bool:
+        return not self.open_units
+
+    '''
+    Open unit with no cells left (the board can't be finished), or None
+    '''
+    def dead_unit(self) -> int | None:
+        for unit in self.open_units:
+            if not self.units[unit] & self.candidates:
+                return unit
+        return None
+
+    '''
+    Readable name of a unit for hint reasons
+    '''
+    def unit_name(self, unit: int) -> str:
+        kind, index = divmod(unit, self.n)
+        return f"{('region', 'row', 'column')[kind]} {index + 1}"
+
+    '''
+    Easiest deduction available on the current candidates
+    output: dictionary with "rule", "place" (cell or None), "eliminate" (mask), and "reason";
+            None when no rule applies
+    '''
+    def next_step(self) -> dict | None:
+        rules = (
+            self._single,
+            lambda: self._group(1, "confinement"),
+            self._elimination,
+            lambda: self._group(2, "pair"),
+            lambda: self._group(3, "triple"),
+            self._chain,
+        )
+        for rule in rules:
+            step = rule()
+            if step is not None:
+                return step
+        return None
+
+    '''
+    Apply one deduction
+    step: dictionary from next_step
+    '''
+    def apply(self, step: dict) -> None:
+        if step["place"] is not None:
+            self.place(step["place"])
+        else:
+            self.eliminate(step["eliminate"])
+
+    # Open unit with a single cell left
+    def _single(self):
+        for unit in sorted(self.open_units):
+            mask = self.units[unit] & self.candidates
+            if mask and not mask & (mask - 1):
+                return {"rule": "single", "place": mask.bit_length() - 1, "eliminate": 0,
+                        "reason": f"only one cell left in {self.unit_name(unit)}"}
+        return None
+
+    # Candidate cells whose queen would leave an open unit with no cells
+        # Those are the cells blocking every cell the unit has left (blocking is symmetric)
+    def _elimination(self):
+        for unit in sorted(self.open_units):
+            mask = self.units[unit] & self.candidates
+            killers = self.candidates & ~self.units[unit]
+            for cell in _cells(mask):
+                killers &= self.blocks[cell]
+                if not killers:
+                    break
+
+            if killers:
+                return {"rule": "elimination", "place": None, "eliminate": killers,
+                        "reason": f"a queen on any of these cells would leave {self.unit_name(unit)} with no cells"}
+        return None
+
+    # Groups of units of one kind whose cells all sit inside as many units of another kind
+        # (size 1 is confinement, 2 a pair, 3 a triple)
+    def _group(self, size: int, rule: str):
+        n = self.n
+        open_units = sorted(self.open_units)
+
+        for kind in range(3):
+            members = [unit for unit in open_units if unit // n == kind]
+            touched = {unit: self._touched(self.units[unit] & self.candidates) for unit in members}
+
+            for other_kind in range(3):
+                if other_kind == kind:
+                    continue
+
+                # Units touching more than `size` units of the other kind can't be in a group
+                fits = [unit for unit in members if touched[unit][other_kind].bit_count() <= size]
+                for group in combinations(fits, size):
+                    covering = 0
+                    for unit in group:
+                        covering |= touched[unit][other_kind]
+                    if covering.bit_count() != size:
+                        continue
+
+                    # Cells of the group, and every cell of the units they're confined to
+                    mask = 0
+                    for unit in group:
+                        mask |= self.units[unit] & self.candidates
+                    others = _cells(covering)
+                    cover_mask = 0
+                    for other in others:
+                        cover_mask |= self.units[other]
+
+                    extra = cover_mask & self.candidates & ~mask
+                    if extra:
+                        group_names = _join(self.unit_name(unit) for unit in group)
+                        other_names = _join(self.unit_name(other) for other in others)
+                        rest = f"the rest of {other_names}" if size == 1 else "the rest of those"
+                        return {"rule": rule, "place": None, "eliminate": extra,
+                                "reason": f"{group_names} must use {other_names}, so {rest} is out"}
+        return None
+
+    # Units of each kind (bitmask of unit numbers) that a set of cells touches
+        # Memoized by mask: a unit's cells rarely change between steps, so most lookups are repeats
+    def _touched(self, mask: int) -> tuple[int, int, int]:
+        kinds = self._touched_memo.get(mask)
+        if kinds is None:
+            region_units = row_units = col_units = 0
+            for cell in _cells(mask):
+                region, row, col = self.cell_units[cell]
+                region_units |= 1 << region
+                row_units |= 1 << row
+                col_units |= 1 << col
+            kinds = self._touched_memo[mask] = (region_units, row_units, col_units)
+        return kinds
+
+    # Candidate cell whose queen forces a run of singles that leaves some unit with no cells
+    def _chain(self):
+        for cell in _cells(self.candidates):
+            candidates = self.candidates
+            open_units = set(self.open_units)
+            forced = 0
+
+            # Place the trial queen, then every queen it forces
+            place = cell
+            dead = None
+            while place is not None and dead is None:
+                candidates &= ~self.blocks[place]
+                open_units.difference_update(self.cell_units[place])
+
+                place = None
+                for unit in open_units:
+                    mask = self.units[unit] & candidates
+                    if not mask:
+                        dead = unit
+                        break
+                    if place is None and not mask & (mask - 1):
+                        place = mask.bit_length() - 1
+                        forced += 1
+
+            if dead is not None:
+                return {"rule": "chain", "place": None, "eliminate": 1 << cell,
+                        "reason": f"a queen here forces {forced} more queen(s) and then leaves "
+                                  f"{self.unit_name(dead)} with no cells"}
+        return None
+
+'''
+Grade a puzzle by the deductions a player needs to solve it
+regions: 2D list of region IDs
+output: dictionary with "level" (hardest rule level, SEARCH_LEVEL if the rules get stuck),
+        "rule" (its name), "steps" (times each rule was used), and "difficulty"
+'''
+def grade_puzzle(regions: list[list[int]]) -> dict:
+    deduction = Deduction(regions)
+    steps = dict.fromkeys(RULES, 0)
+    level = 1
+
+    while not deduction.solved:
+        step = deduction.next_step()
+        # Rules ran out (or the board is contradictory), so it takes guessing
+        if step is None or deduction.dead_unit() is not None:
+            level = SEARCH_LEVEL
+            break
+
+        deduction.apply(step)
+        steps[step["rule"]] += 1
+        level = max(level, RULES.index(step["rule"]) + 1)
+
+    return {
+        "level": level,
+        "rule": RULES[level - 1] if level <= len(RULES) else "search",
+        "steps": steps,
+        "difficulty": difficulty_for_level(level),
+    }
+
+'''
+Next deduction for a board a player is partway through
+deduction: Deduction for the puzzle's regions with no queens placed (fresh() copies are used)
+board: 2D list where each cell is empty (0) or has a queen (1)
+notes: optional 2D list where 1 marks a cell the player has already ruled out
+output: dictionary with "action" ("place", "eliminate", "mistake", "solved", or "stuck"),
+        "cells" ([row, col] pairs), "rule", and "reason"
+'''
+def next_hint(deduction: Deduction, board: list[list[int]], notes: list[list[int]] | None = None) -> dict:
+    n = deduction.n
+    state = deduction.fresh()
+
+    # Player's queens, checking each one still had a cell to go in
+    for row in range(n):
+        for col in range(n):
+            if board[row][col] != 1:
+                continue
+            cell = row * n + col
+            if not state.candidates >> cell & 1:
+                return {"action": "mistake", "cells": [[row, col]], "rule": None,
+                        "reason": "this queen shares a row, column, diagonal, or region with another queen"}
+            state.place(cell)
+
+    noted = 0
+    if notes is not None:
+        noted = sum(1 << (row * n + col) for row in range(n) for col in range(n) if notes[row][col])
+
+    while not state.solved:
+        dead = state.dead_unit()
+        if dead is not None:
+            return {"action": "mistake", "cells": [], "rule": None,
+                    "reason": f"the queens placed so far leave {state.unit_name(dead)} with no cells"}
+
+        step = state.next_step()
+        if step is None:
+            return {"action": "stuck", "cells": [], "rule": None,
+                    "reason": "no single deduction finishes from here; try a queen and see where it leads"}
+
+        if step["place"] is not None:
+            cell = step["place"]
+            return {"action": "place", "cells": [[cell // n, cell % n]], "rule": step["rule"],
+                    "reason": step["reason"]}
+
+        # Eliminations the player already noted aren't news, so keep going
+        new = step["eliminate"] & ~noted
+        if new:
+            return {"action": "eliminate", "cells": [[cell // n, cell % n] for cell in _cells(new)],
+                    "rule": step["rule"], "reason": step["reason"]}
+        state.apply(step)
+
+    return {"action": "solved", "cells": [], "rule": None, "reason": "every region has its queen"}
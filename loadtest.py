@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+
+import httpx
+
+# Same summary statistics as the generation benchmarks
+from benchmark import summarize
+
+'''
+Load test that replays simulated players against the app
+
+Each player asks /generate for a puzzle, then solves it the way a person would: queens go down in a
+random order (following the returned solution), with the occasional wrong queen that gets taken back,
+and the board is sent to /check after every move. Runs in-process (the app and the players share one
+event loop, so the loop lag is the server's) or against a running server with --url.
+
+python loadtest.py --users 50 --duration 30 --difficulty mixed
+'''
+
+ENDPOINTS = ("generate", "check")
+
+'''
+Requests made during the test, grouped by endpoint
+'''
+class Results:
+    def __init__(self):
+        # Latency in milliseconds and response statuses for each endpoint
+        self.latencies = {endpoint: [] for endpoint in ENDPOINTS}
+        self.statuses = {endpoint: {} for endpoint in ENDPOINTS}
+        # Event loop overshoot in milliseconds, one sample per tick
+        self.loop_lag = []
+        self.players = 0
+        self.solved = 0
+
+    def record(self, endpoint: str, seconds: float, status: int) -> None:
+        self.latencies[endpoint].append(seconds * 1000)
+        statuses = self.statuses[endpoint]
+        statuses[status] = statuses.get(status, 0) + 1
+
+'''
+Send one request and record how long it took
+output: parsed JSON body, or None if the request failed
+'''
+async def timed(client: httpx.AsyncClient, results: Results, endpoint: str, method: str, url: str, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        # Connection-level failures are counted as status 0
+        results.record(endpoint, time.perf_counter() - start, 0)
+        return None
+
+    results.record(endpoint, time.perf_counter() - start, response.status_code)
+    # In-process requests can finish without ever suspending, so hand the loop to the other players
+        # (a real socket would) rather than letting one player run many requests back to back
+    await asyncio.sleep(0)
+    if response.status_code != 200:
+        return None
+    return response.json()
+
+'''
+Play one game from /generate to a solved board
+difficulty: easy, medium, or hard
+mistake_rate: chance of placing a wrong queen (then removing it) before each correct one
+think: mean seconds between moves (exponentially distributed, 0 for none)
+'''
+async def play(client: httpx.AsyncClient, results: Results, rng: random.Random, difficulty: str,
+               mistake_rate: float, think: float) -> None:
+    puzzle = await timed(client, results, "generate", "GET", "/generate",
+                         headers = {"Cookie": f"difficulty={difficulty}"})
+    results.players += 1
+    if puzzle is None:
+        return
+
+    size = puzzle["size"]
+    regions = puzzle["regions"]
+    board = [[0] * size for _ in range(size)]
+
+    async def check():
+        if think > 0:
+            await asyncio.sleep(rng.expovariate(1 / think))
+        return await timed(client, results, "check", "POST", "/check",
+                           json = {"size": size, "board": board, "regions": regions})
+
+    rows = list(range(size))
+    rng.shuffle(rows)
+    result = None
+    for row in rows:
+        # Wrong guess somewhere empty, checked, then taken back
+        if rng.random() < mistake_rate:
+            empty = [(r, c) for r in range(size) for c in range(size)
+                     if not board[r][c] and c != puzzle["solution"][r]]
+            wrong_row, wrong_col = rng.choice(empty)
+            board[wrong_row][wrong_col] = 1
+            await check()
+            board[wrong_row][wrong_col] = 0
+            await check()
+
+        board[row][puzzle["solution"][row]] = 1
+        result = await check()
+
+    if result is not None and result["win"]:
+        results.solved += 1
+
+# One simulated user playing game after game until the deadline
+async def user(client: httpx.AsyncClient, results: Results, seed: int, difficulty: str,
+               mistake_rate: float, think: float, deadline: float) -> None:
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        level = rng.choice(["easy", "medium", "hard"]) if difficulty == "mixed" else difficulty
+        await play(client, results, rng, level, mistake_rate, think)
+
+# Sample how late the event loop wakes a sleeping task
+async def watch_loop(results: Results, interval: float = 0.01) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        results.loop_lag.append(max(0.0, time.perf_counter() - start - interval) * 1000)
+
+'''
+Run the players and collect the results
+args: parsed command-line arguments
+output: (results, seconds the players ran for)
+'''
+async def run(args) -> tuple[Results, float]:
+    app = None
+    if args.url:
+        client = httpx.AsyncClient(base_url = args.url, timeout = args.timeout)
+    else:
+        import main
+        app = main.app
+        # Every simulated player comes from the same address, so limits would only measure 429s
+        main.limiter.enabled = args.rate_limits
+        await app.router.startup()
+        if args.warm > 0:
+            await asyncio.to_thread(main.pool.warm, args.warm)
+        client = httpx.AsyncClient(transport = httpx.ASGITransport(app = app), base_url = "http://loadtest",
+                                   timeout = args.timeout)
+
+    results = Results()
+    watcher = asyncio.create_task(watch_loop(results))
+    try:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(user(client, results, args.seed + index, args.difficulty,
+                                    args.mistakes, args.think, deadline)
+                               for index in range(args.users)))
+        elapsed = time.perf_counter() - start
+    finally:
+        watcher.cancel()
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+
+    return results, elapsed
+
+'''
+Summarize a run as JSON-ready data
+'''
+def report(results: Results, elapsed: float, args) -> dict:
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        latencies = results.latencies[endpoint]
+        if not latencies:
+            continue
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "rps": len(latencies) / elapsed,
+            "latency_ms": summarize(latencies),
+            "statuses": {str(status): count for status, count in sorted(results.statuses[endpoint].items())},
+        }
+
+    total = sum(len(latencies) for latencies in results.latencies.values())
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "target": args.url or "in-process",
+            "users": args.users,
+            "duration": args.duration,
+            "difficulty": args.difficulty,
+            "think": args.think,
+            "mistakes": args.mistakes,
+            "rate_limits": args.rate_limits,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "rps": total / elapsed,
+        "players": results.players,
+        "solved": results.solved,
+        "endpoints": endpoints,
+        "loop_lag_ms": summarize(results.loop_lag) if results.loop_lag else None,
+    }
+
+def print_report(summary: dict) -> None:
+    print(f"{'endpoint':<10} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+    for endpoint, stats in summary["endpoints"].items():
+        latency = stats["latency_ms"]
+        statuses = " ".join(f"{status}:{count}" for status, count in stats["statuses"].items())
+        print(f"{endpoint:<10} {stats['requests']:>9} {stats['rps']:>9.1f} {latency['p50']:>9.2f} "
+              f"{latency['p90']:>9.2f} {latency['p99']:>9.2f} {latency['max']:>9.2f}  {statuses}")
+
+    print(f"\n{summary['rps']:.1f} requests/s, {summary['solved']}/{summary['players']} players solved their puzzle")
+    lag = summary["loop_lag_ms"]
+    if lag is not None:
+        where = "server" if summary["meta"]["target"] == "in-process" else "load generator"
+        print(f"event loop lag ({where}): p50 {lag['p50']:.2f} ms, p99 {lag['p99']:.2f} ms, max {lag['max']:.2f} ms")
+
+'''
+Flag endpoints that got slower (or throughput that dropped) compared with an earlier run
+output: number of regressions
+'''
+def compare(summary: dict, baseline: dict, stat: str, threshold: float) -> int:
+    regressions = 0
+    for endpoint, stats in summary["endpoints"].items():
+        before = baseline["endpoints"].get(endpoint, {}).get("latency_ms", {}).get(stat)
+        if not before:
+            continue
+        change = (stats["latency_ms"][stat] - before) / before
+        if change > threshold:
+            print(f"REGRESSION: {endpoint} {stat} latency {before:.2f} -> {stats['latency_ms'][stat]:.2f} ms ({change:+.0%})")
+            regressions += 1
+
+    change = (summary["rps"] - baseline["rps"]) / baseline["rps"]
+    if -change > threshold:
+        print(f"REGRESSION: throughput {baseline['rps']:.1f} -> {summary['rps']:.1f} requests/s ({change:+.0%})")
+        regressions += 1
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description = "Simulate players against the app and report throughput and latency")
+    parser.add_argument("--url", default = None, help = "server to test, e.g. http://127.0.0.1:8000 (default: run the app in-process)")
+    parser.add_argument("--users", type = int, default = 20, help = "concurrent simulated players")
+    parser.add_argument("--duration", type = float, default = 20, help = "seconds to keep starting new games")
+    parser.add_argument("--difficulty", choices = ["easy", "medium", "hard", "mixed"], default = "mixed",
+                        help = "difficulty players ask for (mixed picks one per game)")
+    parser.add_argument("--think", type = float, default = 0, help = "mean seconds between moves (0 for none)")
+    parser.add_argument("--mistakes", type = float, default = 0.2, help = "chance of a wrong queen before each correct one")
+    parser.add_argument("--rate-limits", action = "store_true",
+                        help = "keep the slowapi limits on in-process (start a --url server with RATE_LIMITS=0 to turn them off)")
+    parser.add_argument("--warm", type = float, default = 30, help = "seconds to wait for the in-process pool to fill first")
+    parser.add_argument("--timeout", type = float, default = 30, help = "per-request timeout in seconds")
+    parser.add_argument("--seed", type = int, default = 0, help = "seed for the players' choices")
+    parser.add_argument("--output", "-o", default = None, help = "write the results as JSON")
+    parser.add_argument("--baseline", default = None, help = "earlier --output file to compare against (exit 1 on regression)")
+    parser.add_argument("--stat", default = "p90", choices = ["mean", "p50", "p90", "p99", "max"], help = "latency statistic to compare")
+    parser.add_argument("--threshold", type = float, default = 0.2, help = "allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results, elapsed = asyncio.run(run(args))
+    summary = report(results, elapsed, args)
+    print_report(summary)
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(summary, out, indent = 2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(summary, baseline, args.stat, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
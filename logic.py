@@ -1,62 +1,35 @@
+import logging
 import random
+import time
+
+# Bitboard exact solver
+from solver import enumerate_solutions
+# Alternate-solution tracking while carving
+from uniqueness import UniquenessTracker
+# Region connectivity index for carving
+from connectivity import RegionIndex, neighbor_cells
+# Random N-Queens solution generators
+from placement import solution_generator
+# Human-style difficulty grading
+from grading import grade_puzzle
+# Compact puzzle IDs
+from puzzle_id import encode_puzzle_id, SEED_BITS
+# Rotated and reflected variants of a seeded puzzle
+from symmetry import split_seed, transform_puzzle
+
+logger = logging.getLogger(__name__)
 
 '''
 Generate one N-Queens solution
 board_size: size of the board (square)
+rng: random number generator to draw from (defaults to the global random module)
+method: solution generator from placement.SOLUTION_GENERATORS, or "auto" (backtracking on small boards,
+        min-conflicts from MIN_CONFLICTS_SIZE up)
 output: list where index = row and value = column of each queen in the solution
 '''
-def generate_queen_solution(board_size: int) -> list[int]:
-    # Store queen placement
-    sol = [-1] * board_size
-
-    # Used columns, L -> R diag, and R -> L diag
-    used_cols = set()
-    used_diagLR = set()
-    used_diagRL = set()
-
-    # Recursive helper to place queens onto board
-    def backtrack(row):
-        # Return copy of solution
-            # Further mutations don't alter returned solution!
-        if row == board_size:
-            return sol.copy()
-        
-        # Shuffle all columns to get random solutions
-            # Look through each column in the list
-        for col in random.sample(range(board_size), board_size):
-
-            # Skip placement because column already used or is under attack
-            if col in used_cols or (row + col) in used_diagLR or (row - col) in used_diagRL:
-                continue
-
-            # Put queen in that location
-            sol[row] = col
-
-            # Mark column and diagonals as "occupied"
-            used_cols.add(col)
-            used_diagLR.add(row + col)
-            used_diagRL.add(row - col)
-
-            # Try placing a queen in the next row
-            res = backtrack(row + 1)
-
-            # If a non-None list is returned, we've found a complete solution (bubbles up out of recursion)
-            if res:
-                return res
-            
-            #print(f"undoing placement at ({row}, {col})")
-            
-            # Deeper recursion failed, so remove the queen and try the next column instead
-            used_cols.remove(col)
-            used_diagLR.remove(row + col)
-            used_diagRL.remove(row - col)
-        
-        # Every column in row fails, so return None
-            # Never occur because smallest board is 4 * 4
-        return None
-
-    # Call function starting at row 0
-    solution = backtrack(0)
+def generate_queen_solution(board_size: int, rng: random.Random | None = None, method: str = "auto") -> list[int]:
+    rng = rng or random
+    solution = solution_generator(method, board_size)(board_size, rng)
     #print(f"generate_queen_solution({board_size}) -> {solution}")
     return solution
 
@@ -126,197 +99,138 @@ def is_region_connected(region_board: list[list[int]], region_id: int, cell_to_r
     # Region connected if we visited every cell
     return len(visited) == len(cells)
 
+# Region shape presets for generate_regions
+    # balance: preference for growing the smallest region
+    # compactness: preference for cells with more same-region neighbors (blobs), negative for strands
+REGION_SHAPES = {
+    "random": {"balance": 0.0, "compactness": 0.0},
+    "balanced": {"balance": 1.0, "compactness": 0.0},
+    "compact": {"balance": 0.5, "compactness": 1.0},
+    "snaky": {"balance": 0.0, "compactness": -1.0},
+}
+
+# Fringe entries compared when a shape weighs balance or compactness
+SHAPE_CANDIDATES = 3
+
 '''
 Create regions of colors seeded from queen's solution placement
 solution: list where index = row and value = column of each queen
 board_size: size of the square board (N x N)
+rng: random number generator to draw from (defaults to the global random module)
+shape: name in REGION_SHAPES
 output: 2D list where each cell contains a region ID associated with a queen
 '''
-def generate_regions(solution: list[int], board_size: int) -> list[list[int]]:
-    # Create an empty board of correct size
-    board = [[None for _ in range(board_size)] for _ in range(board_size)]
-    # List of cells to fill next (row, col, region_id)
+def generate_regions(solution: list[int], board_size: int, rng: random.Random | None = None,
+                     shape: str = "random") -> list[list[int]]:
+    rng = rng or random
+    weights = REGION_SHAPES[shape]
+    balance, compactness = weights["balance"], weights["compactness"]
+    n = board_size
+    neighbors = neighbor_cells(n)
+
+    # Flat board (cell = row * N + col), -1 while unassigned
+    board = [-1] * (n * n)
+    # Cells in each region so far
+    sizes = [1] * n
+    # Cells we could claim next as (cell, region_id) pairs
+        # Picked entries are swapped with the last one and popped, so removal is O(1)
     fringe = []
+    # Bitmask of regions each cell is already queued for (no duplicates to filter out later)
+    queued = [0] * (n * n)
+
+    # Add the unassigned neighbors of a newly claimed cell to the fringe
+    def claim(cell, region_id):
+        board[cell] = region_id
+        bit = 1 << region_id
+        for neighbor in neighbors[cell]:
+            if board[neighbor] == -1 and not queued[neighbor] & bit:
+                queued[neighbor] |= bit
+                fringe.append((neighbor, region_id))
 
     # Place each queen's location as seed of region
-    for region_id in range(board_size):
-        row = region_id
-        # Queen at (row, col) in solution
-        col = solution[region_id]
-
-        # Mark cell with its region
-        board[row][col] = region_id
-        #print(f"Seeded region {region_id} at cell ({row}, {col})")
-
-        # Compute neighbor for up, down, left, and right
-        for d_row, d_col in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            neighbor_row = row + d_row
-            neighbor_col = col + d_col
+    for region_id in range(n):
+        claim(region_id * n + solution[region_id], region_id)
 
-            # Ensure neighbor cell inside board
-            if 0 <= neighbor_row < board_size and 0 <= neighbor_col < board_size:
-                # Add cell to fringe
-                    # Next spots we could claim for this region
-                fringe.append((neighbor_row, neighbor_col, region_id))
+    # How much a shape wants a fringe entry (higher is better)
+    def score(entry):
+        cell, region_id = entry
+        value = -balance * sizes[region_id]
+        if compactness:
+            value += compactness * sum(board[neighbor] == region_id for neighbor in neighbors[cell])
+        return value
 
     # Randomized flood fill
         # Helps keep layouts irregular
+    randrange = rng.randrange
     while fringe:
-        # Pick a random cell in fringe and remove from fringe
-        index = random.randrange(len(fringe))
-        row, col, region_id = fringe.pop(index)
-
-        # Skip cells already assigned
-        if board[row][col] is not None:
+        # Pick a fringe entry for the shape
+        if balance or compactness:
+            picks = [randrange(len(fringe)) for _ in range(SHAPE_CANDIDATES)]
+            index = max(picks, key = lambda i: score(fringe[i]))
+        else:
+            index = randrange(len(fringe))
+
+        # Swap-remove the entry
+        entry = fringe[index]
+        last = fringe.pop()
+        if index < len(fringe):
+            fringe[index] = last
+
+        # Skip cells another region claimed first
+        cell, region_id = entry
+        if board[cell] != -1:
             continue
 
-        # Assign cell it's associated region ID
-        board[row][col] = region_id
-        #print(f"Filled cell ({row}, {col}) with region {region_id}")
-
-        # Compute neighbor for up, down, left, and right
-        for d_row, d_col in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            neighbor_row = row + d_row
-            neighbor_col = col + d_col
+        sizes[region_id] += 1
+        claim(cell, region_id)
 
-            # Ensure neighbor cell inside board and not already assigned
-            if (0 <= neighbor_row < board_size and 0 <= neighbor_col < board_size and
-                board[neighbor_row][neighbor_col] is None):
-                # Add cell to fringe
-                    # Next spots we could claim for this region
-                fringe.append((neighbor_row, neighbor_col, region_id))
-    
-    # Final board output
-    #print("\nFinal region board:\n")
-    #for row in board:
-    #    print(" ".join(str(cell) if cell is not None else '.' for cell in row))
-    
     # 2D grid where each cell's value is the ID of the queen-region it belongs to
-    return board
+    return [board[row * n:(row + 1) * n] for row in range(n)]
 
 '''
 Sees if found region placement has a unique solution or needs to be carved
 region_board: 2D list of integers where region_board[row][col] = region_id
+stats: optional dictionary; "nodes" is incremented by the number of search nodes visited
 output: A list of solutions, where each solution maps (row, column): solution[row] = column
 '''
-def find_queen_solutions(region_board: list[list[int]]) -> list[list[int]]:
-    n = len(region_board)
-
-    # Dictionary mapping region ID to a list of board cells (row, col) in that region
-        # Prepares empty list for each region ID (fill with (row, col) coordinates belonging to that region)
-    region_cells = {region_id: [] for region_id in range(n)}
-
-    # Populate region's list with all cells in it
-    for row in range(n):
-        for col in range(n):
-            # Read the region ID of a cell
-            region = region_board[row][col]
-            # Add the cell to its respective list at region position in dictionary
-            region_cells[region].append((row, col))
-
-    # Sort regions by size of cell lists (ascending)
-        # Small cells sorted first (MRV heuristic)
-        # Try most constrained regions first to prune faster
-    region_order = sorted(region_cells, key = lambda r: len(region_cells[r]))
-
-    # Track which constraints are already used
-        # Avoid row, column, and diagonal conflicts
-    used_rows = set()
-    used_cols = set()
-    used_diagLR = set()
-    used_diagRL = set()
-    # Hold cells for each region as partial assignements built
-        # Maps region_id to (row, col)
-    queen_in_region = {}
-    # keep track of solutions found (up to 2 solutions)
-    solutions = []
-
-    # Recursive constraint satisfaction problem (CSP) solver
-        # region_index: which region in region_order we're assigning next
-    def backtrack(region_index):
-        # Only care if there's > 1 solution
-            # Saves work to leave early
-        if len(solutions) >= 2:
-            return
-        
-        # All regions assigned one queen
-        if region_index == n:
-            # Build row -> col list
-            board_row_to_col = [-1] * n
-
-            # Loop through region ids
-            for region_id, (row, col) in queen_in_region.items():
-                # Store column of queen placement in row position of list
-                board_row_to_col[row] = col
-
-            # Add to solutions
-            solutions.append(board_row_to_col)
-            #print(f"Found Solution: {board_row_to_col}")
-            return
-        
-        # Next region ID to place
-        current_region = region_order[region_index]
-        #print(f"Trying to place queen for region {current_region} (index {region_index})")
-
-        # Loop through all possible cell (row, col) slots
-        for (row, col) in region_cells[current_region]:
-            # Placement invalid (conflict with another queen) so skip
-            if (row in used_rows or col in used_cols or
-                (row + col) in used_diagLR or (row - col) in used_diagRL):
-                continue
-
-            # Add queen to that position
-                # Mark all constraints used and record placement
-            used_rows.add(row)
-            used_cols.add(col)
-            used_diagLR.add(row + col)
-            used_diagRL.add(row - col)
-            queen_in_region[current_region] = (row, col)
-
-            # Recurse to fill next region
-            backtrack(region_index + 1)
-
-            # Backtrack (undo) the move
-            used_rows.remove(row)
-            used_cols.remove(col)
-            used_diagLR.remove(row + col)
-            used_diagRL.remove(row - col)
-            del queen_in_region[current_region]
-
-            # Early stopping (2 solutions found)
-            if len(solutions) >= 2:
-                return
-
-    # Call backtrack starting at row 0
-    backtrack(0)
-    #print(f"find_queen_solutions: returning {len(solutions)} solution(s)")
-    return solutions
+def find_queen_solutions(region_board: list[list[int]], stats: dict | None = None) -> list[list[int]]:
+    # Bitboard search with dynamic MRV ordering
+        # Stops after 2 solutions (only care if there's > 1 solution)
+    return enumerate_solutions(region_board, limit=2, stats=stats)
 
 '''
 Modify regions to try and ensure only 1 valid solution
 target_solution: the desired unique N-Queens solution (list of column positions)
 region_board: Current 2D grid where each cell has a region ID
 max_attempts: number of modification attempts before giving up
+stats: optional dictionary; "carve_attempts" and solver "nodes" are incremented
 output: modified region_board with at most one valid N-Queens solution
 '''
-def carve_regions(target_solution: list[int], region_board: list[list[int]], max_attempts: int = 200) -> list[list[int]]:
+def carve_regions(target_solution: list[int], region_board: list[list[int]], max_attempts: int = 200,
+                  stats: dict | None = None) -> list[list[int]]:
     n = len(region_board)
     attempt = 0
+    # Remembers alternate solutions between attempts
+        # Each move only re-searches solutions through the moved cell
+    tracker = UniquenessTracker(target_solution, region_board, stats=stats)
+    # Cached cut cells of each region
+        # "Can this cell leave its region?" without a DFS per probe
+    index = RegionIndex(region_board)
 
     # Cap attempts to carving
     while attempt < max_attempts:
         attempt += 1
+        if stats is not None:
+            stats["carve_attempts"] = stats.get("carve_attempts", 0) + 1
 
-        # Returns up to 2 solutions
-        solutions = find_queen_solutions(region_board)
+        # Alternate solution that we want to get rid of
+        alternate_solution = tracker.alternate()
 
         # Return solution if uniqueness met
-        if len(solutions) < 2:
-            print(f"Uniqueness achieved after {attempt} attempt(s).")
+        if alternate_solution is None:
+            logger.debug("Uniqueness achieved after %d attempt(s).", attempt)
             return region_board
         
-        # Alternate solution that we want to get rid of
-        alternate_solution = solutions[1]
         # See if we've made a change
         made_change = False
 
@@ -340,9 +254,10 @@ def carve_regions(target_solution: list[int], region_board: list[list[int]], max
 
                         # See if regions are different and ensure region connectivity isn't broken
                         if (neighbor_region != region_to_remove_from and
-                            is_region_connected(region_board, region_to_remove_from, (row, wrong_col))):
+                            index.can_leave(row, wrong_col)):
                             # Reassign to neighbor region
-                            region_board[row][wrong_col] = neighbor_region
+                            tracker.reassign(row, wrong_col, neighbor_region)
+                            index.move(row, wrong_col, neighbor_region)
                             made_change = True
                             # Stop after successful change
                             break
@@ -353,9 +268,77 @@ def carve_regions(target_solution: list[int], region_board: list[list[int]], max
         
         # No neighbor merge possible
         if not made_change:
-            print(f"Gave up after {attempt} attempt(s): can't modify further.")
+            logger.debug("Gave up after %d attempt(s): can't modify further.", attempt)
             return region_board
 
     # Max attempts reached
-    print(f"Maximum attempts ({max_attempts}) reached without enforcing uniqueness.")
-    return region_board
\ No newline at end of file
+    logger.debug("Maximum attempts (%d) reached without enforcing uniqueness.", max_attempts)
+    return region_board
+
+'''
+Raised when puzzle generation runs past its deadline
+'''
+class GenerationTimeout(Exception):
+    pass
+
+'''
+Build one puzzle with a unique solution
+board_size: size of the square board (N x N)
+deadline: optional time.monotonic() value; generation gives up once it passes
+seed: optional seed; the same seed and size always build the same puzzle (random if omitted)
+      a variant seed (symmetry.variant_seed) builds its base puzzle and then rotates or reflects it
+stats: optional dictionary; "regenerations", "carve_attempts", and solver "nodes" are incremented
+output: dictionary with the puzzle ID, board size, queen solution, and carved region board
+'''
+def generate_puzzle(board_size: int, deadline: float | None = None, seed: int | None = None,
+                    stats: dict | None = None) -> dict:
+    if seed is None:
+        seed = random.getrandbits(SEED_BITS)
+
+    base_seed, symmetry = split_seed(seed)
+    if symmetry:
+        return transform_puzzle(generate_puzzle(board_size, deadline, base_seed, stats), symmetry)
+
+    # Every random choice comes from this generator, so the seed pins down the puzzle
+    rng = random.Random(seed)
+
+    # Loop until a valid puzzle is found
+    while True:
+        # Stop runaway regeneration loops
+        if deadline is not None and time.monotonic() > deadline:
+            raise GenerationTimeout(f"no unique {board_size}x{board_size} puzzle before the deadline")
+
+        # Generate queens solution
+        solution = generate_queen_solution(board_size, rng)
+        # Flood-fill region colors (seeding is queen solution)
+        regions = generate_regions(solution, board_size, rng)
+        # Carve regions to ensure unique solution
+        carved = carve_regions(solution, regions, stats=stats)
+
+        # Only return if unique solution is found
+        if len(find_queen_solutions(carved, stats=stats)) < 2:
+            return {"id": encode_puzzle_id(seed, board_size), "size": board_size, "solution": solution, "regions": carved}
+
+        # Carving couldn't reach uniqueness, so start over
+        if stats is not None:
+            stats["regenerations"] = stats.get("regenerations", 0) + 1
+
+'''
+Build one puzzle and report how much work it took (for worker processes feeding metrics)
+board_size, deadline, seed: same as generate_puzzle
+grade: also grade the puzzle (adds "difficulty" to the puzzle and "grade_seconds" to the stats)
+output: (puzzle dictionary, stats dictionary with "seconds" plus the generate_puzzle counters)
+'''
+def generate_puzzle_with_stats(board_size: int, deadline: float | None = None,
+                               seed: int | None = None, grade: bool = False) -> tuple[dict, dict]:
+    stats = {"regenerations": 0, "carve_attempts": 0, "nodes": 0}
+    start = time.perf_counter()
+    puzzle = generate_puzzle(board_size, deadline, seed, stats)
+    stats["seconds"] = time.perf_counter() - start
+
+    if grade:
+        start = time.perf_counter()
+        puzzle["difficulty"] = grade_puzzle(puzzle["regions"])["difficulty"]
+        stats["grade_seconds"] = time.perf_counter() - start
+
+    return puzzle, stats
@@ -6,42 +6,253 @@ docker run -p 8000:8000 queen-game
 http://localhost:8000/
 '''
 # Web framework
-from fastapi import FastAPI, Path, HTTPException, Request
+from fastapi import FastAPI, Path, Query, HTTPException, Request, WebSocket, WebSocketDisconnect
 # Serve files from a static folder
 from fastapi.staticfiles import StaticFiles
+# Run blocking calls on a worker thread
+from fastapi.concurrency import run_in_threadpool
 # Return file responses and JSON responses
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, PlainTextResponse, StreamingResponse
 # Used for input validation
-from pydantic import BaseModel, Field, validator, root_validator
-from typing import List
+from pydantic import BaseModel, Field, validator, root_validator, ValidationError
+from typing import List, Optional
 # Game logic imports
-from logic import generate_queen_solution, generate_regions, carve_regions, find_queen_solutions, queens_attack
+from logic import generate_puzzle, generate_puzzle_with_stats, GenerationTimeout
+# Board validation
+from checker import check_board
+# Server-side game sessions
+from sessions import SessionStore
+# Deduction engine for hints
+from grading import Deduction, next_hint
+# Background puzzle pool (kept in Redis when REDIS_URL is set)
+from pool import PuzzlePool
+from shared_pool import SharedPuzzlePool, connect
+# Catches repeated puzzles (in any orientation) before they reach the pool
+from symmetry import DedupeIndex
+# Puzzle IDs and the cache of recently served puzzles
+from puzzle_id import decode_puzzle_id, MAX_SEED
+from cache import LRUCache
+# Pre-generated puzzles on disk
+from store import PuzzleStore, encode_puzzle
+# Streamed puzzle packs
+from export import iter_pack, validate_pack
+from batch import parse_size_range
+# Pre-encoded JSON for puzzles and results the server produced
+from responses import FastJSONResponse, puzzle_json, prepare_puzzle, with_token, dumps, loads
 # Puzzle size
 import random
+# Pool configuration
+import os
+# Run generation off the event loop
+import asyncio
+import logging
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+# Counters and histograms for /metrics
+from metrics import Registry, RequestTimer
 # Rate limit to protect API
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
+from limits import parse as parse_limit
+
+logger = logging.getLogger(__name__)
+
+# Shared Redis for rate-limit counters and the puzzle pool, so every worker enforces one limit
+# and draws from one pool (memory:// keeps both in this process)
+REDIS_URL = os.environ.get("REDIS_URL")
 
 # Create limiter
-limiter = Limiter(key_func = get_remote_address)
+    # Falls back to per-process counters while Redis is unreachable instead of failing requests
+    # RATE_LIMITS=0 turns limits off (e.g. load tests, where every simulated player shares one address)
+limiter = Limiter(key_func = get_remote_address, storage_uri = REDIS_URL or "memory://",
+                  in_memory_fallback_enabled = REDIS_URL is not None,
+                  enabled = os.environ.get("RATE_LIMITS", "1") == "1")
+
+# Metrics exposed on /metrics
+registry = Registry()
+REQUEST_SECONDS = registry.histogram(
+    "queens_http_request_seconds", "HTTP request latency by endpoint", ("endpoint",))
+RATE_LIMITED = registry.counter(
+    "queens_rate_limited_total", "Requests rejected by the rate limiter", ("endpoint",))
+GENERATE_SECONDS = registry.histogram(
+    "queens_generate_seconds", "Time to hand out a puzzle from /generate", ("difficulty", "size", "source"))
+GENERATION_SECONDS = registry.histogram(
+    "queens_generation_seconds", "Time spent building one puzzle in a worker", ("size",))
+CARVE_ATTEMPTS = registry.histogram(
+    "queens_carve_attempts", "Carving attempts per generated puzzle", ("size",),
+    buckets = (1, 2, 5, 10, 25, 50, 100, 200, 500))
+REGENERATIONS = registry.counter(
+    "queens_regenerations_total", "Whole-puzzle regenerations after carving gave up", ("size",))
+SOLVER_NODES = registry.histogram(
+    "queens_solver_nodes", "Solver search nodes per generated puzzle", ("size",),
+    buckets = (10, 100, 1000, 10000, 100000, 1000000))
+WS_MOVE_SECONDS = registry.histogram(
+    "queens_ws_move_seconds", "Time to apply one move on the game WebSocket", ("action",))
+GRADED = registry.counter(
+    "queens_graded_total", "Pool puzzles by graded difficulty", ("difficulty", "size"))
+
+# Count rate-limit rejections before the usual 429 response
+def rate_limit_exceeded(request: Request, exc: RateLimitExceeded):
+    endpoint = request.scope.get("endpoint")
+    RATE_LIMITED.inc(getattr(endpoint, "__name__", "unknown"))
+    return _rate_limit_exceeded_handler(request, exc)
 
 # Create API app and serve files from static directory
 app = FastAPI()
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded)
+app.add_middleware(RequestTimer, histogram = REQUEST_SECONDS)
 app.mount("/static", StaticFiles(directory = "static"), name = "static")
 
 # No saved state and default to easy difficulty
 rand_one = 4
 rand_two = 6
 
+# Map difficulty to range of board sizes
+DIFFICULTY_MAP = {
+    "easy": (4, 6),
+    "medium": (7, 8),
+    "hard": (9, 10)
+}
+
+'''
+Record the work a worker process did to build a puzzle
+'''
+def record_generation(puzzle: dict, stats: dict) -> None:
+    size = str(puzzle["size"])
+    GENERATION_SECONDS.observe(stats["seconds"], size)
+    CARVE_ATTEMPTS.observe(stats["carve_attempts"], size)
+    SOLVER_NODES.observe(stats["nodes"], size)
+    if stats["regenerations"]:
+        REGENERATIONS.inc(size, amount = stats["regenerations"])
+    if "difficulty" in puzzle:
+        GRADED.inc(puzzle["difficulty"], size)
+
+# Recent puzzles the pool remembers to drop repeats (0 turns repeat checks off)
+POOL_DEDUPE_SIZE = int(os.environ.get("POOL_DEDUPE_SIZE", 0))
+# Ready puzzles for each difficulty, refilled by a worker process
+pool_options = {
+    "low_watermark": int(os.environ.get("POOL_LOW_WATERMARK", 5)),
+    "high_watermark": int(os.environ.get("POOL_HIGH_WATERMARK", 20)),
+    "workers": int(os.environ.get("POOL_WORKERS", 1)),
+    "graded": os.environ.get("POOL_GRADED", "0") == "1",
+    "on_generated": record_generation,
+    "variants": os.environ.get("POOL_VARIANTS", "0") == "1",
+    # Off by default: small boards have few distinct puzzles, so a large index soon rejects most of them
+    "dedupe": DedupeIndex(POOL_DEDUPE_SIZE) if POOL_DEDUPE_SIZE > 0 else None
+}
+if REDIS_URL:
+    pool = SharedPuzzlePool(DIFFICULTY_MAP, connect(REDIS_URL),
+                            prefix = os.environ.get("POOL_REDIS_PREFIX", "queens:pool"), **pool_options)
+else:
+    # Local puzzles stay as dictionaries, so their response JSON can be encoded as they're stored
+    pool = PuzzlePool(DIFFICULTY_MAP, prepare = prepare_puzzle, **pool_options)
+registry.gauge("queens_pool_ready", "Ready puzzles in the pool", ("difficulty",),
+               lambda: {(name,): pool.available(name) for name in DIFFICULTY_MAP})
+
+# Send server-built responses through the response models too (slower; for debugging the fast path)
+STRICT_RESPONSES = os.environ.get("STRICT_RESPONSES", "0") == "1"
+
+# Seconds startup waits for the pool to reach the low watermark before taking traffic (0 to not wait)
+POOL_WARM_TIMEOUT = float(os.environ.get("POOL_WARM_TIMEOUT", 0))
+
+# Seconds a request may spend generating one size before falling back to a smaller one
+GENERATE_TIMEOUT = float(os.environ.get("GENERATE_TIMEOUT", 2.0))
+# Worker processes for generation on a pool miss (started at startup)
+GENERATE_WORKERS = int(os.environ.get("GENERATE_WORKERS", 2))
+generate_executor = None
+
+# Recently served puzzles by ID (misses are rebuilt from the seed in the ID)
+puzzle_cache = LRUCache(int(os.environ.get("PUZZLE_CACHE_SIZE", 10000)))
+
+# Hint tables for recently hinted region layouts
+hint_tables = LRUCache(int(os.environ.get("HINT_CACHE_SIZE", 1000)))
+
+# Bearer token for /export (the endpoint is off when unset)
+EXPORT_TOKEN = os.environ.get("EXPORT_TOKEN")
+# Most puzzles one export may ask for
+EXPORT_MAX_COUNT = int(os.environ.get("EXPORT_MAX_COUNT", 1000000))
+# Worker processes generating puzzles for exports, shared by every export (0 exports stored puzzles only)
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", 2))
+export_executor = None
+
+# Boards kept on the server so moves don't re-upload the puzzle
+session_store = SessionStore(int(os.environ.get("MAX_SESSIONS", 10000)))
+
+# Messages a /ws/game connection may send each minute, malformed ones included (slowapi only covers HTTP routes)
+WS_MOVES_PER_MINUTE = int(os.environ.get("WS_MOVES_PER_MINUTE", 150))
+# Sessions a client may start each minute, through POST /session and /ws/game together
+SESSION_LIMIT = "20/minute"
+SESSION_LIMIT_SCOPE = "sessions"
+
+# Optional store of pre-generated puzzles (built with batch.py --format store)
+PUZZLE_STORE = os.environ.get("PUZZLE_STORE")
+puzzle_store = PuzzleStore(PUZZLE_STORE) if PUZZLE_STORE else None
+
+@app.on_event("startup")
+def start_pool():
+    global generate_executor, export_executor
+    generate_executor = ProcessPoolExecutor(max_workers = GENERATE_WORKERS)
+    if EXPORT_TOKEN and EXPORT_WORKERS > 0:
+        export_executor = ProcessPoolExecutor(max_workers = EXPORT_WORKERS)
+        # Workers are forked on first use, so fork them now from the main thread rather than from
+            # the request thread of the first export
+        export_executor.submit(os.getpid).result()
+    pool.start()
+    # Startup finishes before the server accepts connections, so blocking here holds traffic back
+    if POOL_WARM_TIMEOUT > 0 and not pool.warm(POOL_WARM_TIMEOUT):
+        logger.warning("Pool not warm after %.1f s, serving anyway", POOL_WARM_TIMEOUT)
+
+@app.on_event("shutdown")
+def stop_pool():
+    # Wait for every worker process to exit
+        # serve.py workers leave with os._exit right after this, which would orphan any still running
+    pool.stop()
+    generate_executor.shutdown(wait = True, cancel_futures = True)
+    if export_executor is not None:
+        export_executor.shutdown(wait = True, cancel_futures = True)
+    if puzzle_store is not None:
+        puzzle_store.close()
+
+'''
+Generate a puzzle in a worker process without blocking the event loop
+smallest, largest: board size range of the difficulty
+output: puzzle dictionary, possibly smaller than the first size picked if time ran out
+'''
+async def generate_within_budget(smallest: int, largest: int) -> dict:
+    loop = asyncio.get_running_loop()
+    size = random.randint(smallest, largest)
+
+    # Step down one size at a time (staying in the band) whenever the budget runs out
+    for attempt_size in range(size, smallest - 1, -1):
+        # Worker checks the deadline itself, so a runaway attempt stops on its own
+        deadline = time.monotonic() + GENERATE_TIMEOUT
+        job = loop.run_in_executor(generate_executor, generate_puzzle_with_stats, attempt_size, deadline)
+
+        try:
+            # Small grace period so the worker's own timeout normally fires first
+            puzzle, stats = await asyncio.wait_for(job, GENERATE_TIMEOUT + 0.5)
+        except (GenerationTimeout, asyncio.TimeoutError):
+            continue
+
+        record_generation(puzzle, stats)
+        return puzzle
+
+    raise HTTPException(status_code = 503, detail = "Puzzle generation timed out, try again")
+
 ''' Pydantic Validation '''
 
 class GenerateResponse(BaseModel):
+    id: str
     size: int = Field(..., ge=4, le=12)
     solution: List[int]
     regions: List[List[int]]
+    # Graded difficulty, when the puzzle came from a graded pool or store
+    difficulty: Optional[str] = None
+    # Session for incremental move checks
+    token: Optional[str] = None
 
     @validator("solution", each_item=True)
     def validate_solution_values(cls, v):
@@ -93,6 +304,79 @@ class CheckResponse(BaseModel):
     win: bool
     conflicts: List[List[int]]
 
+# Used when a session is started for a board the client already has (e.g. a loaded save)
+class SessionRequest(BaseModel):
+    size: int = Field(..., ge=4, le=12)
+    regions: List[List[int]]
+    # Queens already placed (optional)
+    board: Optional[List[List[int]]] = None
+    # Cells already ruled out (optional)
+    notes: Optional[List[List[int]]] = None
+
+    # Validate model after all data available
+    @root_validator
+    def validate_matrices(cls, values):
+        size = values.get("size")
+        for name in ["board", "regions", "notes"]:
+            matrix = values.get(name)
+            if matrix is not None:
+                if len(matrix) != size or any(len(r) != size for r in matrix):
+                    raise ValueError(f"{name} must be a {size} x {size} matrix")
+
+        regions = values.get("regions")
+        if regions is not None and any(not 0 <= val < size for row in regions for val in row):
+            raise ValueError(f"region values must be between 0 and {size - 1}")
+        return values
+
+# Used when a player asks for a hint
+class HintRequest(BaseModel):
+    size: int = Field(..., ge=4, le=12)
+    # Queens placed so far (1) and empty cells (0)
+    board: List[List[int]]
+    regions: List[List[int]]
+    # Cells the player has already ruled out (optional)
+    notes: Optional[List[List[int]]] = None
+
+    # Validate model after all data available
+    @root_validator
+    def validate_matrices(cls, values):
+        size = values.get("size")
+        for name in ["board", "regions", "notes"]:
+            matrix = values.get(name)
+            if matrix is not None:
+                if len(matrix) != size or any(len(r) != size for r in matrix):
+                    raise ValueError(f"{name} must be a {size} x {size} matrix")
+
+        regions = values.get("regions")
+        if regions is not None and any(not 0 <= val < size for row in regions for val in row):
+            raise ValueError(f"region values must be between 0 and {size - 1}")
+
+        # Board and notes mark cells with 0 or 1 only
+        for name in ["board", "notes"]:
+            matrix = values.get(name)
+            if matrix is not None and any(val not in (0, 1) for row in matrix for val in row):
+                raise ValueError(f"{name} values must be 0 or 1")
+        return values
+
+# Next deduction for the player
+class HintResponse(BaseModel):
+    # place, eliminate, mistake, solved, or stuck
+    action: str
+    cells: List[List[int]]
+    rule: Optional[str] = None
+    reason: str
+
+class SessionResponse(BaseModel):
+    token: str
+    win: bool
+    conflicts: List[List[int]]
+
+# One queen placed or removed in a session
+class MoveRequest(BaseModel):
+    row: int = Field(..., ge=0)
+    col: int = Field(..., ge=0)
+    action: str = Field(..., regex="^(place|remove)$")
+
 # Used when a save is created
 class SaveRequest(BaseModel):
     size: int = Field(..., ge=4, le=12)
@@ -119,77 +403,358 @@ def root():
     return FileResponse("static/index.html")
 
 # Generate a puzzle
-@app.get("/generate", response_model = GenerateResponse)
+@app.get("/generate", response_model = GenerateResponse, response_class = FastJSONResponse)
 # Limit to 20 generations a minute
 @limiter.limit("20/minute")
-def generate(request: Request):
+async def generate(request: Request):
     difficulty = request.cookies.get("difficulty", "easy")
+    if difficulty not in DIFFICULTY_MAP:
+        difficulty = "easy"
+
+    rand_one, rand_two = DIFFICULTY_MAP[difficulty]
+    start = time.perf_counter()
+
+    # Ready puzzle from the pool
+        # The Redis pool makes network round trips, so it's read on a worker thread instead of the event loop
+    if REDIS_URL:
+        puzzle = await run_in_threadpool(pool.get, difficulty)
+    else:
+        puzzle = pool.get(difficulty)
+    source = "pool"
+
+    # Pool ran dry, so draw from the pre-generated store
+    if puzzle is None and puzzle_store is not None:
+        puzzle = puzzle_store.sample((rand_one, rand_two))
+        source = "store"
+
+    # Nothing stored either, so generate in a worker process
+    if puzzle is None:
+        puzzle = await generate_within_budget(rand_one, rand_two)
+        source = "generated"
+
+    GENERATE_SECONDS.observe(time.perf_counter() - start, difficulty, str(puzzle["size"]), source)
+
+    # Shared links to this puzzle are served from the cache
+    puzzle_cache.put(puzzle["id"], puzzle)
+
+    # Session for this player's moves
+    token, _ = session_store.create(puzzle["regions"])
+    return puzzle_response(puzzle, token)
+
+# Fetch a puzzle by ID (shared links and daily puzzles)
+@app.get("/puzzle/{puzzle_id}", response_model = GenerateResponse, response_class = FastJSONResponse)
+# Limit to 60 lookups a minute
+@limiter.limit("60/minute")
+async def get_puzzle(request: Request, puzzle_id: str = Path(..., regex="^[0-9a-z]{1,12}$")):
+    return puzzle_response(await load_puzzle(puzzle_id))
+
+# Fetch a puzzle by ID in the compact binary encoding (see store.py)
+@app.get("/puzzle/{puzzle_id}/packed", response_class = Response)
+# Limit to 60 lookups a minute
+@limiter.limit("60/minute")
+async def get_packed_puzzle(request: Request, puzzle_id: str = Path(..., regex="^[0-9a-z]{1,12}$")):
+    puzzle = await load_puzzle(puzzle_id)
+    return Response(content = encode_puzzle(puzzle), media_type = "application/octet-stream")
 
-    # Map difficulty to range
-    difficulty_map = {
-        "easy": (4, 6),
-        "medium": (7, 8),
-        "hard": (9, 10)
-    }
-
-    rand_one, rand_two = difficulty_map.get(difficulty, (4, 6))
+'''
+Look up a puzzle by ID, rebuilding it from its seed on a cache miss
+puzzle_id: ID returned by /generate
+output: puzzle dictionary
+'''
+async def load_puzzle(puzzle_id: str) -> dict:
+    puzzle = puzzle_cache.get(puzzle_id)
+    if puzzle is not None:
+        return puzzle
+
+    seed, size = decode_puzzle_id(puzzle_id)
+
+    # Only rebuild sizes the game actually serves, from seeds the generator could have issued
+    smallest = min(band[0] for band in DIFFICULTY_MAP.values())
+    largest = max(band[1] for band in DIFFICULTY_MAP.values())
+    if not smallest <= size <= largest or seed > MAX_SEED:
+        raise HTTPException(status_code = 404, detail = "Puzzle not found")
+
+    # Same seed and size always rebuild the same puzzle
+    loop = asyncio.get_running_loop()
+    deadline = time.monotonic() + GENERATE_TIMEOUT
+    try:
+        puzzle = await loop.run_in_executor(generate_executor, generate_puzzle, size, deadline, seed)
+    except GenerationTimeout:
+        raise HTTPException(status_code = 503, detail = "Puzzle generation timed out, try again")
+
+    puzzle_cache.put(puzzle_id, puzzle)
+    return puzzle
 
-    # Loop until a valid puzzle is found
-    while True:
-        # Size of puzzle
-        size = random.randint(rand_one, rand_two)
-        # Generate queens solution
-        solution = generate_queen_solution(size)
-        # Flood-fill region colors (seeding is queen solution)
-        regions = generate_regions(solution, size)
-        # Carve regions to ensure unique solution
-        carved = carve_regions(solution, regions)
-
-        # Only return if unique solution is found
-        if len(find_queen_solutions(carved)) < 2:
-            return {"size": size, "solution": solution, "regions": carved}
+'''
+Response for a puzzle the server built (pool, store, or generator)
+Skips GenerateResponse and sends the puzzle's cached JSON with the token spliced in.
+puzzle: puzzle dictionary
+token: session token, or None
+output: JSON response
+'''
+def puzzle_response(puzzle: dict, token: str | None = None) -> Response:
+    if STRICT_RESPONSES:
+        return FastJSONResponse(GenerateResponse(**puzzle, token = token).dict())
+    return FastJSONResponse(with_token(puzzle_json(puzzle), token))
+
+# Response for a board check the server just ran (same shape as CheckResponse)
+def check_response(win: bool, conflicts: list[list[int]]) -> Response:
+    if STRICT_RESPONSES:
+        return FastJSONResponse(CheckResponse(win = win, conflicts = conflicts).dict())
+    return FastJSONResponse({"win": win, "conflicts": conflicts})
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema = False)
+def get_metrics():
+    return PlainTextResponse(registry.render(), media_type = "text/plain; version=0.0.4")
 
 # See if board matches solution or has conflicts
-@app.post("/check", response_model = CheckResponse)
+@app.post("/check", response_model = CheckResponse, response_class = FastJSONResponse)
 # Limit to 150 checks a minute
 @limiter.limit("150/minute")
 async def check(request: Request, payload: CheckRequest):
-    board, regions, size = payload.board, payload.regions, payload.size
-
-    # See if there are duplicate queens in the same region
-        # Should never happen as queens are moved via region
-    region_seen = set()
-    # Stores placed queens
-    positions = []
-    # Stores all conflicts
-    conflicts = []
-
-    # Loop through the board one square at a time
-    for row in range(size):
-        for col in range(size):
-            # Queen placed at square
-            if board[row][col] == 1:
-                reg = regions[row][col]
-                # Append to conflicts is that region already seen
-                if reg in region_seen:
-                    conflicts.append((row, col))
-                # Add to regions seen and queen positions
-                region_seen.add(reg)
-                positions.append((row, col))
-
-    # Look through all queen positions
-    for idx, (r, c) in enumerate(positions):
-        for r2, c2 in positions[idx + 1:]:
-            # Add to conflicts and any queens are attacking one another
-            if queens_attack(r, c, r2, c2):
-                conflicts.extend([(r, c), (r2, c2)])
-
-    return {
-        # No conflicts and all queens place
-        "win": len(region_seen) == size and len(conflicts) == 0,
-        # Conflicts present
-        "conflicts": [list(pos) for pos in set(conflicts)]
-    }
+    # Single pass with per-line queen counts
+    win, conflicts = check_board(payload.board, payload.regions)
+    return check_response(win, conflicts)
+
+# Next logically forced placement or elimination
+@app.post("/hint", response_model = HintResponse)
+# Limit to 60 hints a minute
+@limiter.limit("60/minute")
+async def hint(request: Request, payload: HintRequest):
+    # Board tables are built once per region layout and reused for every hint on it
+    key = tuple(map(tuple, payload.regions))
+    deduction = hint_tables.get(key)
+    if deduction is None:
+        deduction = Deduction(payload.regions)
+        hint_tables.put(key, deduction)
+
+    return next_hint(deduction, payload.board, payload.notes)
+
+# Start a session for a board the client already has (e.g. a loaded save)
+@app.post("/session", response_model = SessionResponse)
+# Limit to 20 sessions a minute (shared with sessions started over /ws/game)
+@limiter.shared_limit(SESSION_LIMIT, scope = SESSION_LIMIT_SCOPE)
+async def create_session(request: Request, payload: SessionRequest):
+    token, session = restore_session(payload)
+    return {"token": token, "win": session.win, "conflicts": session.conflicts()}
+
+'''
+New session holding a board the client already has
+payload: validated SessionRequest
+output: (token, session) with the payload's queens and notes restored
+'''
+def restore_session(payload: SessionRequest):
+    token, session = session_store.create(payload.regions)
+
+    for row in range(payload.size):
+        for col in range(payload.size):
+            if payload.board is not None and payload.board[row][col] == 1:
+                session.place(row, col)
+            elif payload.notes is not None and payload.notes[row][col]:
+                session.set_note(row, col)
+    return token, session
+
+# Apply one move to a session and report conflicts
+    # Replaces re-uploading the whole board and regions to /check on every click
+@app.post("/session/{token}/move", response_model = CheckResponse, response_class = FastJSONResponse)
+# Limit to 150 moves a minute
+@limiter.limit("150/minute")
+async def session_move(request: Request, payload: MoveRequest, token: str = Path(..., max_length = 64)):
+    session = session_store.get(token)
+    if session is None:
+        raise HTTPException(status_code = 404, detail = "Session not found")
+
+    try:
+        if payload.action == "place":
+            session.place(payload.row, payload.col)
+        else:
+            session.remove(payload.row, payload.col)
+    except ValueError as error:
+        raise HTTPException(status_code = 400, detail = str(error))
+
+    return check_response(session.win, session.conflicts())
+
+'''
+Game channel holding one puzzle per connection: moves in, conflict changes out
+First message picks the board, answered with {"token", "win", "conflicts", "notes"}:
+    {"token": "..."}                            session from /generate or POST /session
+    {"size": N, "regions": [...], "board": [...], "notes": [...]}   new session (e.g. a loaded save),
+                                                checked and rate limited like POST /session
+Every later message is ["place" | "remove" | "note" | "unnote", row, col]. Places and removes are answered in order
+with {"added": [[row, col], ...], "cleared": [[row, col], ...], "win": bool}; notes (set and cleared) aren't answered.
+A bad message gets {"error": "..."} and the connection stays open. Binary frames close it with 1003.
+'''
+@app.websocket("/ws/game")
+async def game_channel(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        session = await open_channel(websocket)
+        if session is not None:
+            await play_channel(websocket, session)
+    except WebSocketDisconnect:
+        pass
+
+# Next text frame, or None after closing the socket for a binary one (the channel only speaks JSON text)
+async def receive_text(websocket: WebSocket) -> str | None:
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+
+    text = message.get("text")
+    if text is None:
+        await websocket.close(code = 1003, reason = "Only text frames are accepted")
+    return text
+
+# Attach the connection to a session from its first message (closes the socket and returns None if it can't)
+async def open_channel(websocket: WebSocket):
+    text = await receive_text(websocket)
+    if text is None:
+        return None
+    try:
+        start = loads(text)
+    except ValueError:
+        start = None
+
+    if isinstance(start, dict) and "token" in start:
+        token = start["token"]
+        session = session_store.get(token) if isinstance(token, str) else None
+        if session is None:
+            await websocket.close(code = 4404, reason = "Session not found")
+            return None
+    else:
+        try:
+            payload = SessionRequest.parse_obj(start)
+        except ValidationError as error:
+            await websocket.close(code = 4400, reason = str(error)[:120])
+            return None
+
+        if limiter.enabled and not hit_session_limit(get_remote_address(websocket)):
+            RATE_LIMITED.inc("game_channel")
+            await websocket.close(code = 4429, reason = "Rate limit exceeded")
+            return None
+
+        token, session = restore_session(payload)
+
+    # Notes come back so a resumed board shows them
+    reply = {"token": token, "win": session.win, "conflicts": session.conflicts(), "notes": session.notes()}
+    await websocket.send_text(dumps(reply).decode())
+    return session
+
+# Count a new session against the budget slowapi keeps for POST /session (shared limits are keyed by client and scope)
+    # Storage errors are handled like slowapi handles them for routes: switch to its in-memory counters
+    # when that's enabled, otherwise log and let the session through if it swallows errors, or raise
+def hit_session_limit(key: str) -> bool:
+    limit = parse_limit(SESSION_LIMIT)
+    try:
+        return limiter.limiter.hit(limit, key, SESSION_LIMIT_SCOPE)
+    except Exception:
+        if limiter._in_memory_fallback_enabled and not limiter._storage_dead:
+            logger.warning("Rate limit storage unreachable - falling back to in-memory storage")
+            limiter._storage_dead = True
+            return limiter.limiter.hit(limit, key, SESSION_LIMIT_SCOPE)
+        if limiter._swallow_errors:
+            logger.exception("Failed to rate limit. Swallowing error")
+            return True
+        raise
+
+# Apply moves until the client disconnects
+async def play_channel(websocket: WebSocket, session) -> None:
+    window_start = time.monotonic()
+    moves = 0
+
+    while True:
+        text = await receive_text(websocket)
+        if text is None:
+            return
+
+        # Fixed one-minute windows per connection
+            # Every frame counts, so malformed ones can't be sent without limit
+        now = time.monotonic()
+        if now - window_start >= 60:
+            window_start, moves = now, 0
+        moves += 1
+        if moves > WS_MOVES_PER_MINUTE:
+            RATE_LIMITED.inc("game_channel")
+            await websocket.send_text('{"error":"rate limit exceeded"}')
+            continue
+
+        try:
+            action, row, col = loads(text)
+        except (ValueError, TypeError):
+            action = row = col = None
+        if action not in ("place", "remove", "note", "unnote") or type(row) is not int or type(col) is not int:
+            await websocket.send_text(dumps({"error": "moves are [action, row, col], action being place, remove, note, or unnote"}).decode())
+            continue
+
+        start = time.perf_counter()
+        try:
+            if action in ("note", "unnote"):
+                session.set_note(row, col, action == "note")
+                WS_MOVE_SECONDS.observe(time.perf_counter() - start, action)
+                continue
+            added, cleared = session.place(row, col) if action == "place" else session.remove(row, col)
+        except ValueError as error:
+            await websocket.send_text(dumps({"error": str(error)}).decode())
+            continue
+
+        # Only the queens whose conflict state changed
+        reply = dumps({"added": sorted(added), "cleared": sorted(cleared), "win": session.win})
+        WS_MOVE_SECONDS.observe(time.perf_counter() - start, action)
+        await websocket.send_text(reply.decode())
+
+'''
+Stream a puzzle pack (see export.py): stored puzzles first, then generated ones
+Only sends the next chunk once the client has taken the last, so memory stays flat for any count.
+Requires "Authorization: Bearer <EXPORT_TOKEN>".
+'''
+@app.get("/export")
+# Limit to 10 exports a minute
+@limiter.limit("10/minute")
+def export(request: Request,
+           count: int = Query(..., ge = 1, description = "number of puzzles"),
+           sizes: str = Query("4-10", regex = r"^\d{1,2}(-\d{1,2})?$", description = "board sizes, e.g. 4-10"),
+           fmt: str = Query("ndjson", alias = "format", regex = "^(ndjson|binary)$"),
+           source: str = Query("auto", regex = "^(auto|store|generate)$"),
+           seed: Optional[int] = Query(None, ge = 0, description = "seed for a repeatable generated part"),
+           grade: bool = Query(False, description = "grade generated puzzles")):
+    if not EXPORT_TOKEN:
+        raise HTTPException(status_code = 404, detail = "Export is not enabled")
+
+    # Constant-time comparison so the token can't be guessed a character at a time
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), EXPORT_TOKEN.encode()):
+        raise HTTPException(status_code = 401, detail = "Invalid export token", headers = {"WWW-Authenticate": "Bearer"})
+
+    if count > EXPORT_MAX_COUNT:
+        raise HTTPException(status_code = 400, detail = f"count must be at most {EXPORT_MAX_COUNT}")
+
+    # Only sizes the game serves (larger boards take far longer to carve)
+    size_range = parse_size_range(sizes)
+    largest = max(band[1] for band in DIFFICULTY_MAP.values())
+    if size_range[1] > largest:
+        raise HTTPException(status_code = 400, detail = f"sizes must be at most {largest}")
+
+    # Without export workers only stored puzzles can go out
+    if export_executor is None:
+        if source == "generate":
+            raise HTTPException(status_code = 400, detail = "Generating puzzles for export is disabled")
+        source = "store"
+
+    try:
+        validate_pack(count, size_range, fmt, source, puzzle_store)
+    except ValueError as error:
+        raise HTTPException(status_code = 400, detail = str(error))
+
+    # Sync generator: Starlette pulls each chunk on a worker thread as the client reads
+        # Every export shares the one export pool, so concurrent exports can't start more processes
+    chunks = iter_pack(count, size_range, fmt, source, puzzle_store, EXPORT_WORKERS, seed, grade,
+                       export_executor)
+    if fmt == "binary":
+        return StreamingResponse(chunks, media_type = "application/octet-stream",
+                                 headers = {"Content-Disposition": 'attachment; filename="puzzles.qpz"'})
+    return StreamingResponse(chunks, media_type = "application/x-ndjson",
+                             headers = {"Content-Disposition": 'attachment; filename="puzzles.ndjson"'})
 
 # Change difficulty of the game
 # Limit to 5 difficulty changes a minute
@@ -199,17 +764,10 @@ async def check(request: Request, payload: CheckRequest):
 )
 @limiter.limit("5/minute")
 def set_difficulty(request: Request, level: str = Path(..., regex="^(easy|medium|hard)$", description="easy, medium, or hard")):
-    # Map difficulty to range
-    difficulty_map = {
-        "easy": (4, 6),
-        "medium": (7, 8),
-        "hard": (9, 10)
-    }
-
-    if level not in difficulty_map:
+    if level not in DIFFICULTY_MAP:
         raise HTTPException(status_code = 400, detail = "Invalid difficulty")
 
-    rand_one, rand_two = difficulty_map[level]
+    rand_one, rand_two = DIFFICULTY_MAP[level]
     
     # Set difficulty in a cookie
     response = JSONResponse(content = {"status": "difficulty set", "range": [rand_one, rand_two]})
@@ -0,0 +1,162 @@
+import bisect
+import threading
+import time
+
+'''
+Minimal Prometheus-style metrics (counters, histograms, and scrape-time gauges)
+
+Recording is a dictionary update under a lock; text is only built when /metrics is scraped.
+'''
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Render label names and values as {name="value",...}
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+'''
+Count that only goes up
+name: metric name
+description: help text
+labels: label names; inc() takes one value per label
+'''
+class Counter:
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+'''
+Distribution of observed values in cumulative buckets
+name: metric name
+description: help text
+labels: label names; observe() takes one value per label after the observed value
+buckets: upper bounds of the buckets (ascending)
+'''
+class Histogram:
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        # Per label values: [count in each bucket (+Inf last), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _format_labels(self.labels, label_values, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+'''
+Value read only when scraped (e.g. pool sizes)
+name: metric name
+description: help text
+labels: label names
+read: function returning a dictionary of label value tuples to current values
+'''
+class Gauge:
+    def __init__(self, name: str, description: str, labels: tuple[str, ...], read):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.read = read
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self.read().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+'''
+Collection of metrics rendered together for /metrics
+'''
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, description: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, description, labels))
+
+    def histogram(self, name: str, description: str, labels: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, description, labels, buckets))
+
+    def gauge(self, name: str, description: str, labels: tuple[str, ...], read) -> Gauge:
+        return self._add(Gauge(name, description, labels, read))
+
+    '''
+    Prometheus text exposition format
+    '''
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+'''
+ASGI middleware timing every HTTP request by endpoint function name
+app: ASGI app to wrap
+histogram: histogram with one label (the endpoint name)
+'''
+class RequestTimer:
+    def __init__(self, app, histogram: Histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Router fills in the matched endpoint (name keeps label values bounded)
+            endpoint = scope.get("endpoint")
+            if endpoint is None:
+                name = "unmatched"
+            else:
+                name = getattr(endpoint, "__name__", type(endpoint).__name__)
+            self.histogram.observe(time.perf_counter() - start, name)
@@ -0,0 +1,193 @@
+import random
+
+'''
+Generators for random N-Queens solutions (one queen per row, column, and diagonal)
+
+Every generator takes (board_size, rng) and returns a list where index = row and value = column,
+or None when the board has no solution (sizes 2 and 3).
+'''
+
+# Boards at least this big use min-conflicts when no method is given
+    # Smaller boards keep backtracking so seeded puzzle IDs rebuild the same puzzle
+MIN_CONFLICTS_SIZE = 20
+
+# Random swap partners min-conflicts tries for each attacked queen
+PARTNER_TRIES = 4
+
+'''
+Depth-first search trying each row's columns in a random order
+Iterative (explicit per-row state) so large boards can't hit the recursion limit,
+and draws from rng exactly like the original recursive version did.
+board_size: size of the board (square)
+rng: random number generator to draw from
+output: solution, or None if there is none
+'''
+def backtrack_solution(board_size: int, rng: random.Random) -> list[int] | None:
+    n = board_size
+    if n == 0:
+        return []
+
+    # Store queen placement
+    sol = [-1] * n
+
+    # Used columns, L -> R diag, and R -> L diag
+    used_cols = set()
+    used_diagLR = set()
+    used_diagRL = set()
+
+    # Shuffled columns for each row and how far through them we are
+        # A row's order is drawn when the search first steps into it
+    order = [None] * n
+    tried = [0] * n
+    order[0] = rng.sample(range(n), n)
+
+    row = 0
+    while row >= 0:
+        # Coming back to a row, so lift its queen before trying the next column
+        if sol[row] != -1:
+            col = sol[row]
+            used_cols.remove(col)
+            used_diagLR.remove(row + col)
+            used_diagRL.remove(row - col)
+            sol[row] = -1
+
+        # Next column in this row that isn't under attack
+        while tried[row] < n:
+            col = order[row][tried[row]]
+            tried[row] += 1
+            if col in used_cols or (row + col) in used_diagLR or (row - col) in used_diagRL:
+                continue
+
+            sol[row] = col
+            used_cols.add(col)
+            used_diagLR.add(row + col)
+            used_diagRL.add(row - col)
+            break
+
+        # Every column in row fails, so go back a row
+        if sol[row] == -1:
+            row -= 1
+            continue
+
+        # Last row placed
+        if row == n - 1:
+            return sol.copy()
+
+        row += 1
+        order[row] = rng.sample(range(n), n)
+        tried[row] = 0
+
+    return None
+
+'''
+Min-conflicts local search over permutations
+Starts from a random permutation (so rows and columns are already covered once), then for every
+attacked queen swaps its column with a random row's as long as that doesn't add diagonal conflicts.
+Each swap is scored in O(1) from per-diagonal counts, so a pass over the board is O(N) and
+large boards settle in a handful of passes. Restarts from a fresh permutation if it stalls.
+board_size: size of the board (square)
+rng: random number generator to draw from
+max_restarts: fresh permutations to try before giving up
+output: solution, or None if none was found
+'''
+def min_conflicts_solution(board_size: int, rng: random.Random, max_restarts: int = 1000) -> list[int] | None:
+    n = board_size
+    if n in (2, 3):
+        return None
+
+    # Passes in a row without an improving swap before restarting
+    stall_limit = 3 + n // 10
+
+    for _ in range(max_restarts):
+        sol = list(range(n))
+        rng.shuffle(sol)
+
+        # Queens on each L -> R (row + col) and R -> L (row - col + n - 1) diagonal
+        diag_lr = [0] * (2 * n - 1)
+        diag_rl = [0] * (2 * n - 1)
+        for row, col in enumerate(sol):
+            diag_lr[row + col] += 1
+            diag_rl[row - col + n - 1] += 1
+
+        # Number of attacking pairs
+        collisions = sum(k * (k - 1) // 2 for k in diag_lr) + sum(k * (k - 1) // 2 for k in diag_rl)
+
+        stalled = 0
+        while collisions and stalled < stall_limit:
+            improved = False
+
+            for row in range(n):
+                col = sol[row]
+                # Only rows whose queen is attacked are worth moving
+                if diag_lr[row + col] < 2 and diag_rl[row - col + n - 1] < 2:
+                    continue
+
+                # A few random partners, taking the first swap that doesn't make things worse
+                    # Sideways swaps (no change) let the search walk across plateaus
+                for _ in range(PARTNER_TRIES):
+                    other = rng.randrange(n)
+                    if other == row:
+                        continue
+
+                    delta = _swap(sol, diag_lr, diag_rl, row, other, n)
+                    if delta <= 0:
+                        collisions += delta
+                        improved = improved or delta < 0
+                        break
+
+                    # Worse, so swap back
+                    _swap(sol, diag_lr, diag_rl, row, other, n)
+
+                if not collisions:
+                    break
+
+            stalled = 0 if improved else stalled + 1
+
+        if not collisions:
+            return sol
+
+    return None
+
+# Swap the columns of two rows, keeping the diagonal counts up to date
+    # Returns the change in attacking pairs
+def _swap(sol, diag_lr, diag_rl, row_a, row_b, n) -> int:
+    delta = 0
+
+    # Lift both queens (each leaves behind count - 1 partners)
+    for row in (row_a, row_b):
+        col = sol[row]
+        diag_lr[row + col] -= 1
+        diag_rl[row - col + n - 1] -= 1
+        delta -= diag_lr[row + col] + diag_rl[row - col + n - 1]
+
+    sol[row_a], sol[row_b] = sol[row_b], sol[row_a]
+
+    # Put them back in the swapped columns (each meets count partners)
+    for row in (row_a, row_b):
+        col = sol[row]
+        delta += diag_lr[row + col] + diag_rl[row - col + n - 1]
+        diag_lr[row + col] += 1
+        diag_rl[row - col + n - 1] += 1
+
+    return delta
+
+# Solution generators by name
+SOLUTION_GENERATORS = {
+    "backtrack": backtrack_solution,
+    "min_conflicts": min_conflicts_solution,
+}
+
+'''
+Look up a solution generator
+method: name in SOLUTION_GENERATORS, or "auto" to pick by board size
+board_size: size of the board (used by "auto")
+output: generator function taking (board_size, rng)
+'''
+def solution_generator(method: str, board_size: int):
+    if method == "auto":
+        method = "min_conflicts" if board_size >= MIN_CONFLICTS_SIZE else "backtrack"
+
+    try:
+        return SOLUTION_GENERATORS[method]
+    except KeyError:
+        raise ValueError(f"unknown solution generator {method!r} (choose from {', '.join(SOLUTION_GENERATORS)})") from None
@@ -0,0 +1,250 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Game logic imports
+from logic import generate_puzzle_with_stats
+# Rotated and reflected copies, and catching repeats
+from symmetry import SYMMETRIES, puzzle_variants
+
+logger = logging.getLogger(__name__)
+
+'''
+Background-filled stock of ready puzzles for each difficulty band
+bands: maps difficulty name to the (smallest, largest) board size in that band
+low_watermark: refill a band once fewer than this many puzzles are ready
+high_watermark: number of puzzles (ready + in progress) a refill tops a band up to
+workers: number of processes generating puzzles
+graded: grade each puzzle and file it under the band matching its graded difficulty (when that band
+        has room), so bands hold puzzles by how hard they are rather than only by size
+on_generated: optional callback(puzzle, stats) run for each finished puzzle (e.g. metrics)
+variants: add every distinct rotation and reflection of each generated puzzle (up to 8 per generation),
+          interleaved with other generations so no two puzzles in a row are copies of each other
+          (copies that can't be placed yet wait for the next generation)
+dedupe: optional symmetry.DedupeIndex; generated puzzles it has already seen (in any orientation) are dropped
+prepare: optional callback(puzzle) run on each puzzle before it's stored, off the request path
+         (e.g. caching its encoded response)
+'''
+class PuzzlePool:
+    def __init__(self, bands: dict[str, tuple[int, int]], low_watermark: int = 5,
+                 high_watermark: int = 20, workers: int = 1, graded: bool = False,
+                 on_generated = None, variants: bool = False, dedupe = None,
+                 prepare = None):
+        if not 0 <= low_watermark <= high_watermark:
+            raise ValueError("watermarks must satisfy 0 <= low_watermark <= high_watermark")
+
+        self.bands = bands
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.workers = workers
+        self.graded = graded
+        self.on_generated = on_generated
+        self.variants = variants
+        self.dedupe = dedupe
+        self.prepare = prepare
+        # Puzzles each generation job is counted as in the pending totals
+        self._per_job = SYMMETRIES if variants else 1
+
+        # Ready puzzles for each band (popped from the left, appended on the right)
+        self._ready = {name: deque() for name in bands}
+        # Puzzles submitted to the worker processes but not finished yet
+        self._pending = {name: 0 for name in bands}
+        # Finished generations (lists of variants) waiting to be interleaved into each band
+        self._held = {name: [] for name in bands}
+        # Generation the last puzzle stored in each band came from
+        self._last_family = {name: None for name in bands}
+        # Guards pending counts (callbacks run on the executor's thread)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    '''
+    Start the worker processes and fill every band up to the high watermark
+    '''
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+
+        self._executor = ProcessPoolExecutor(max_workers = self.workers)
+        for name in self.bands:
+            self._top_up(name)
+
+    '''
+    Stop the worker processes and drop any puzzles still being generated
+    Waits for the workers to exit (at most the jobs already running), so none outlive the server process
+    '''
+    def stop(self) -> None:
+        if self._executor is None:
+            return
+
+        executor, self._executor = self._executor, None
+        executor.shutdown(wait = True, cancel_futures = True)
+
+    '''
+    Wait for every band to reach the low watermark (e.g. before the server takes traffic)
+    timeout: most seconds to wait
+    output: whether every band got there in time
+    '''
+    def warm(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while any(self.available(name) < self.low_watermark for name in self.bands):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    '''
+    Hand out a ready puzzle for a difficulty
+    difficulty: name of the band
+    output: puzzle dictionary, or None when the band is empty (caller generates inline)
+    '''
+    def get(self, difficulty: str) -> dict | None:
+        if difficulty not in self.bands:
+            return None
+
+        puzzle = self._pop(difficulty)
+
+        # Refill once we drop under the low watermark
+        if self._count(difficulty) < self.low_watermark:
+            self._top_up(difficulty)
+
+        return puzzle
+
+    '''
+    Number of ready puzzles in a band
+    '''
+    def available(self, difficulty: str) -> int:
+        if difficulty not in self.bands:
+            return 0
+        return self._count(difficulty)
+
+    # Storage for ready puzzles (overridden by SharedPuzzlePool to keep them in Redis)
+        # Oldest ready puzzle in a band, or None when it's empty
+    def _pop(self, name: str) -> dict | None:
+        try:
+            return self._ready[name].popleft()
+        except IndexError:
+            return None
+
+    def _push(self, name: str, puzzle: dict) -> None:
+        self._ready[name].append(puzzle)
+
+    def _count(self, name: str) -> int:
+        return len(self._ready[name])
+
+    # Submit enough jobs to bring the band back up to the high watermark
+    def _top_up(self, name: str) -> None:
+        executor = self._executor
+        if executor is None:
+            return
+
+        smallest, largest = self.bands[name]
+
+        with self._lock:
+            # Still above the low watermark
+            if self._count(name) >= self.low_watermark:
+                return
+
+            # Count jobs already in progress (and held variants) so they aren't submitted twice
+            held = sum(len(family) for family in self._held[name])
+            missing = self.high_watermark - self._count(name) - self._pending[name] - held
+            if missing <= 0:
+                return
+            # With variants each job brings in several puzzles
+            jobs = -(-missing // self._per_job)
+            self._pending[name] += jobs * self._per_job
+
+        for submitted in range(jobs):
+            size = random.randint(smallest, largest)
+            try:
+                future = executor.submit(generate_puzzle_with_stats, size, grade = self.graded)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory), which breaks the whole executor
+                    # Hand back the jobs not submitted yet and start again on a new one
+                with self._lock:
+                    self._pending[name] -= (jobs - submitted) * self._per_job
+                self._replace_executor(executor)
+                self._top_up(name)
+                return
+            except RuntimeError:
+                # Executor shut down underneath us
+                with self._lock:
+                    self._pending[name] -= self._per_job
+                continue
+            future.add_done_callback(lambda f, name = name: self._collect(name, f))
+
+    # Swap a broken executor for a new one (unless stop() or another thread already has)
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = ProcessPoolExecutor(max_workers = self.workers)
+        logger.warning("Puzzle pool workers died, starting new ones")
+        broken.shutdown(wait = False, cancel_futures = True)
+
+    # Add a finished generation to a band, never putting two puzzles from one generation next to each other
+        # Always takes from the largest waiting generation that didn't supply the previous puzzle, which leaves
+        # at most one generation's variants held back for the next one to interleave with
+    def _store(self, name: str, puzzles: list[dict]) -> None:
+        with self._lock:
+            families = self._held[name]
+            families.append(list(puzzles))
+            last = self._last_family[name]
+
+            while True:
+                candidates = [family for family in families if family is not last]
+                if not candidates:
+                    break
+                # Ties go to the oldest generation
+                family = max(candidates, key = len)
+                self._push(name, family.pop(0))
+                last = family
+                if not family:
+                    families.remove(family)
+
+            self._last_family[name] = last
+
+    # Move a finished puzzle into its band (or the band of its graded difficulty)
+    def _collect(self, name: str, future) -> None:
+        with self._lock:
+            self._pending[name] -= self._per_job
+
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        if error is not None:
+            logger.warning("Puzzle generation failed for %s: %r", name, error)
+            # Refilling submits to the broken executor, which replaces it
+            if isinstance(error, BrokenProcessPool):
+                self._top_up(name)
+            return
+
+        puzzle, stats = future.result()
+
+        # Seen before (possibly rotated or recoloured), so generate another in its place
+        if self.dedupe is not None and not self.dedupe.add(puzzle["regions"]):
+            logger.debug("Dropped repeated %dx%d puzzle %s", puzzle["size"], puzzle["size"], puzzle["id"])
+            self._top_up(name)
+            return
+
+        # Other band only takes it while its ready and in-progress puzzles are under the high watermark
+        target = puzzle.get("difficulty", name)
+        with self._lock:
+            if target not in self.bands or self._count(target) + self._pending[target] >= self.high_watermark:
+                target = name
+
+        puzzles = puzzle_variants(puzzle) if self.variants else [puzzle]
+        if self.prepare is not None:
+            for stored in puzzles:
+                self.prepare(stored)
+        self._store(target, puzzles)
+        if self.on_generated is not None:
+            self.on_generated(puzzle, stats)
+
+        # Puzzle went to another band, so this one may still be short
+        if target != name:
+            self._top_up(name)
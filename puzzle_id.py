@@ -0,0 +1,45 @@
+import string
+
+# Seeds are drawn with this many random bits (IDs stay around 10 characters)
+SEED_BITS = 48
+# Variants (symmetry.py) carry their symmetry in the 3 bits above the seed, so no issued ID has a seed past this
+MAX_SEED = (1 << (SEED_BITS + 3)) - 1
+# Base-36 digits in the longest issued ID
+MAX_ID_LENGTH = 12
+# Board sizes below 64 fit in the low bits of an ID
+SIZE_BITS = 6
+
+# Lowercase base 36 keeps IDs URL-safe and easy to read out
+ALPHABET = string.digits + string.ascii_lowercase
+
+'''
+Build the ID that regenerates a puzzle
+seed: seed the puzzle was generated from
+board_size: size of the square board (N x N)
+output: short base-36 string
+'''
+def encode_puzzle_id(seed: int, board_size: int) -> str:
+    if not 0 <= board_size < 1 << SIZE_BITS:
+        raise ValueError(f"board size must be below {1 << SIZE_BITS}")
+    if seed < 0:
+        raise ValueError("seed must be >= 0")
+
+    value = (seed << SIZE_BITS) | board_size
+    digits = []
+    while True:
+        value, digit = divmod(value, len(ALPHABET))
+        digits.append(ALPHABET[digit])
+        if value == 0:
+            return "".join(reversed(digits))
+
+'''
+Read the seed and board size back out of a puzzle ID
+puzzle_id: ID made by encode_puzzle_id
+output: (seed, board size)
+'''
+def decode_puzzle_id(puzzle_id: str) -> tuple[int, int]:
+    if not puzzle_id or any(char not in ALPHABET for char in puzzle_id):
+        raise ValueError(f"invalid puzzle ID: {puzzle_id!r}")
+
+    value = int(puzzle_id, len(ALPHABET))
+    return value >> SIZE_BITS, value & ((1 << SIZE_BITS) - 1)
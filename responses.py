@@ -0,0 +1,80 @@
+import json
+
+# Fastest available JSON encoder (falls back to the standard library without orjson)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from fastapi.responses import Response
+
+'''
+Fast JSON responses for data the server produced itself
+
+Puzzles from the pool, the store, or the generator are known to be well formed, so they skip the
+response models and go straight to bytes. A puzzle's JSON is encoded once and cached on the puzzle,
+and the per-player session token is spliced into those bytes rather than re-encoding the board.
+'''
+
+# Where a puzzle's encoded JSON is cached (not a response field, so the models ignore it)
+ENCODED_KEY = "_json"
+
+'''
+Encode a value as compact JSON
+value: dictionaries, lists, tuples, strings, numbers, booleans, and None
+output: UTF-8 bytes
+'''
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators = (",", ":")).encode()
+
+'''
+Decode JSON text or bytes (raises ValueError when it isn't valid JSON)
+'''
+def loads(data: str | bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+'''
+Response whose content is already-encoded JSON bytes or a value to encode with dumps
+'''
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+'''
+JSON for a puzzle with the GenerateResponse fields (token left off), encoded on first use
+puzzle: puzzle dictionary
+output: UTF-8 bytes of a JSON object
+'''
+def puzzle_json(puzzle: dict) -> bytes:
+    encoded = puzzle.get(ENCODED_KEY)
+    if encoded is None:
+        encoded = dumps({"id": puzzle["id"], "size": puzzle["size"], "solution": puzzle["solution"],
+                         "regions": puzzle["regions"], "difficulty": puzzle.get("difficulty")})
+        # Racing threads just encode the same bytes twice
+        puzzle[ENCODED_KEY] = encoded
+    return encoded
+
+'''
+Cache a puzzle's JSON ahead of time (e.g. as the pool stores it, off the request path)
+puzzle: puzzle dictionary, updated in place
+'''
+def prepare_puzzle(puzzle: dict) -> None:
+    puzzle_json(puzzle)
+
+'''
+Add a session token to an encoded puzzle without decoding it
+body: bytes from puzzle_json
+token: session token, or None
+output: UTF-8 bytes of the puzzle object with a "token" field at the end
+'''
+def with_token(body: bytes, token: str | None) -> bytes:
+    # Replace the closing brace with the extra field
+    return body[:-1] + b',"token":' + dumps(token) + b"}"
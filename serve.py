@@ -0,0 +1,197 @@
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+logger = logging.getLogger("serve")
+
+'''
+Production entry point: pre-fork uvicorn workers sharing one listening socket
+
+The parent imports the app (logic, solver, grading, ...) and builds the per-size lookup tables once,
+then forks the workers, so they start with everything already loaded (shared copy-on-write) instead
+of each importing from scratch. Each worker fills its puzzle pool before it takes traffic.
+SIGTERM or SIGINT lets in-flight requests finish before the workers exit.
+
+REDIS_URL=redis://localhost:6379/0 python serve.py --workers 4 --port 8000
+'''
+
+# Workers that exit within this many seconds of starting are restarted after a pause
+    # Stops a worker that crashes on startup from being forked in a tight loop
+RESPAWN_BACKOFF = 1.0
+
+'''
+Import the app and fill the lookup tables every request path uses
+sizes: board sizes to build tables for
+output: the FastAPI app
+'''
+def preload(sizes) -> object:
+    import main
+    from solver import line_masks
+    from connectivity import neighbor_cells
+    from grading import cell_tables
+
+    for size in sizes:
+        line_masks(size)
+        neighbor_cells(size)
+        cell_tables(size)
+
+    return main.app
+
+'''
+Bind the listening socket in the parent so every worker accepts from it
+host, port: address to listen on
+output: bound, listening socket
+'''
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+'''
+Run one worker on the shared socket until it's told to stop (runs in the forked child)
+config: uvicorn configuration for the app
+sock: listening socket
+'''
+def run_worker(config: uvicorn.Config, sock: socket.socket) -> None:
+    # Parent's handlers don't belong here (uvicorn installs its own for a graceful exit)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+
+    server = uvicorn.Server(config)
+    server.run(sockets = [sock])
+
+'''
+Fork the workers, restart any that die, and stop them all on SIGTERM or SIGINT
+config: uvicorn configuration for the app
+sock: listening socket
+workers: number of worker processes
+graceful_timeout: seconds workers get to finish in-flight requests before they're killed
+'''
+def supervise(config: uvicorn.Config, sock: socket.socket, workers: int, graceful_timeout: float) -> None:
+    # Worker PID to the time it was started
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(config, sock)
+            except BaseException:
+                logger.exception("Worker %d failed", os.getpid())
+                code = 1
+            finally:
+                # Never fall back into the parent's loop
+                os._exit(code)
+        children[pid] = time.monotonic()
+        logger.info("Started worker %d", pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info("Stopping %d worker(s)", len(children))
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        # Workers still running a few seconds past the grace period (shutdown hooks included) are killed
+        signal.alarm(int(graceful_timeout) + 5)
+
+    def kill(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    # Objects loaded so far are never collected, so the collector doesn't touch (and copy) their pages
+    gc.freeze()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGALRM, kill)
+
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+
+        logger.warning("Worker %d exited with status %d, restarting", pid, os.waitstatus_to_exitcode(status))
+        if time.monotonic() - started < RESPAWN_BACKOFF:
+            time.sleep(RESPAWN_BACKOFF)
+        # Signal may have arrived during the pause
+        if not stopping:
+            spawn()
+
+    sock.close()
+
+'''
+Number of workers to run when --workers isn't given
+output: WEB_CONCURRENCY if set, else one per CPU when REDIS_URL is set and 1 otherwise
+'''
+def default_workers() -> int:
+    if "WEB_CONCURRENCY" in os.environ:
+        return int(os.environ["WEB_CONCURRENCY"])
+    # Pools, rate limits, and caches are per process unless they're shared through Redis
+    if os.environ.get("REDIS_URL"):
+        return os.cpu_count() or 1
+    return 1
+
+def main():
+    parser = argparse.ArgumentParser(description = "Serve the app with pre-forked uvicorn workers")
+    parser.add_argument("--host", default = "0.0.0.0", help = "address to listen on")
+    parser.add_argument("--port", type = int, default = 8000, help = "port to listen on")
+    parser.add_argument("--workers", type = int, default = default_workers(),
+                        help = "worker processes (default WEB_CONCURRENCY, else the CPU count with REDIS_URL set and 1 without)")
+    parser.add_argument("--warm", type = float, default = float(os.environ.get("POOL_WARM_TIMEOUT", 30)),
+                        help = "seconds each worker waits for its puzzle pool to fill before taking traffic (0 to not wait)")
+    parser.add_argument("--graceful-timeout", type = float, default = 30,
+                        help = "seconds to let in-flight requests finish on shutdown")
+    parser.add_argument("--log-level", default = "info", help = "uvicorn log level")
+    args = parser.parse_args()
+
+    logging.basicConfig(level = args.log_level.upper(), format = "%(levelname)s:     %(message)s")
+
+    # Tables for every size the binary store (and so puzzle IDs and hints) covers
+    from store import MAX_SIZE
+    start = time.perf_counter()
+    app = preload(range(4, MAX_SIZE + 1))
+
+    import main as app_module
+    app_module.POOL_WARM_TIMEOUT = args.warm
+    logger.info("Preloaded app in %.2f s", time.perf_counter() - start)
+
+    config = uvicorn.Config(app, log_level = args.log_level, timeout_graceful_shutdown = args.graceful_timeout)
+    sock = bind_socket(args.host, args.port)
+    logger.info("Listening on %s:%d with %d worker(s)", args.host, args.port, args.workers)
+    if args.workers > 1 and not os.environ.get("REDIS_URL"):
+        logger.warning("Running %d workers without REDIS_URL: each keeps its own pool, rate limits, and sessions",
+                       args.workers)
+
+    supervise(config, sock, max(1, args.workers), args.graceful_timeout)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import secrets
+
+# Bounded token -> session map
+from cache import LRUCache
+
+'''
+Precomputed indexes for one region board
+regions: 2D list of region IDs
+'''
+class BoardLayout:
+    def __init__(self, regions: list[list[int]]):
+        n = len(regions)
+        self.size = n
+
+        # Region, row, column, and diagonal index of each cell (row * N + col)
+            # Lines are numbered rows, then columns, then L -> R diagonals, then R -> L diagonals
+        self.region_of = [region for row in regions for region in row]
+        self.lines_of = [
+            (row, n + col, 2 * n + row + col, 5 * n - 2 + row - col)
+            for row in range(n)
+            for col in range(n)
+        ]
+        self.line_count = 6 * n - 2
+
+'''
+One player's board on the server, with conflicts kept up to date move by move
+
+Each move only touches the queens sharing a line with the moved queen,
+so a move costs O(queens on those lines) instead of rescanning the board.
+
+layout: precomputed indexes of the puzzle's region board
+'''
+class GameSession:
+    def __init__(self, layout: BoardLayout):
+        self.layout = layout
+
+        # Queen cell in each region (one queen per region, like the front end enforces)
+        self._queen_in_region = {}
+        # Queen cells on each row, column, and diagonal
+        self._line_queens = [set() for _ in range(layout.line_count)]
+        # Queen cells currently in conflict
+        self._conflicts = set()
+        # Cells the player has marked as ruled out
+        self._notes = set()
+
+    '''
+    Place a queen, moving the region's existing queen if it has one
+    row, col: cell to place the queen on
+    output: (cells that became conflicts, cells that stopped being conflicts)
+    '''
+    def place(self, row: int, col: int) -> tuple[set[tuple[int, int]], set[tuple[int, int]]]:
+        cell = self._cell(row, col)
+        region = self.layout.region_of[cell]
+
+        added, cleared = set(), set()
+        previous = self._queen_in_region.get(region)
+        if previous == cell:
+            return added, cleared
+
+        # Only one queen per region
+        if previous is not None:
+            self._lift(previous, added, cleared)
+
+        self._queen_in_region[region] = cell
+        for line in self.layout.lines_of[cell]:
+            self._line_queens[line].add(cell)
+        self._refresh(cell, added, cleared)
+
+        return self._as_positions(added), self._as_positions(cleared)
+
+    '''
+    Remove a queen (no change if the cell is empty)
+    row, col: cell to clear
+    output: (cells that became conflicts, cells that stopped being conflicts)
+    '''
+    def remove(self, row: int, col: int) -> tuple[set[tuple[int, int]], set[tuple[int, int]]]:
+        cell = self._cell(row, col)
+        added, cleared = set(), set()
+
+        if self._queen_in_region.get(self.layout.region_of[cell]) == cell:
+            self._lift(cell, added, cleared)
+
+        return self._as_positions(added), self._as_positions(cleared)
+
+    '''
+    Mark or unmark a cell as ruled out (notes don't affect conflicts)
+    Explicit rather than a toggle, so a repeated or replayed message can't flip the note back
+    row, col: cell to mark
+    marked: True to mark the cell, False to clear it
+    '''
+    def set_note(self, row: int, col: int, marked: bool = True) -> None:
+        cell = self._cell(row, col)
+        if marked:
+            self._notes.add(cell)
+        else:
+            self._notes.discard(cell)
+
+    '''
+    Cells marked as ruled out
+    output: list of [row, col] pairs
+    '''
+    def notes(self) -> list[list[int]]:
+        n = self.layout.size
+        return [[cell // n, cell % n] for cell in sorted(self._notes)]
+
+    '''
+    Queens currently in conflict
+    output: list of [row, col] pairs
+    '''
+    def conflicts(self) -> list[list[int]]:
+        n = self.layout.size
+        return [[cell // n, cell % n] for cell in sorted(self._conflicts)]
+
+    '''
+    True when every region has a queen and nothing conflicts
+    '''
+    @property
+    def win(self) -> bool:
+        return len(self._queen_in_region) == self.layout.size and not self._conflicts
+
+    # Cell number for a (row, col), rejecting cells off the board
+    def _cell(self, row: int, col: int) -> int:
+        n = self.layout.size
+        if not (0 <= row < n and 0 <= col < n):
+            raise ValueError(f"cell ({row}, {col}) is off the {n} x {n} board")
+        return row * n + col
+
+    # Take a queen off the board and update the queens it was attacking
+    def _lift(self, cell: int, added: set, cleared: set) -> None:
+        del self._queen_in_region[self.layout.region_of[cell]]
+        for line in self.layout.lines_of[cell]:
+            self._line_queens[line].discard(cell)
+
+        if cell in self._conflicts:
+            self._conflicts.discard(cell)
+            # Cleared unless it was flagged earlier in the same move
+            if cell in added:
+                added.discard(cell)
+            else:
+                cleared.add(cell)
+
+        self._refresh(cell, added, cleared)
+
+    # Recheck every queen sharing a line with the cell
+    def _refresh(self, cell: int, added: set, cleared: set) -> None:
+        affected = set()
+        for line in self.layout.lines_of[cell]:
+            affected |= self._line_queens[line]
+
+        for queen in affected:
+            attacked = any(len(self._line_queens[line]) > 1 for line in self.layout.lines_of[queen])
+            if attacked and queen not in self._conflicts:
+                self._conflicts.add(queen)
+                if queen in cleared:
+                    cleared.discard(queen)
+                else:
+                    added.add(queen)
+            elif not attacked and queen in self._conflicts:
+                self._conflicts.discard(queen)
+                if queen in added:
+                    added.discard(queen)
+                else:
+                    cleared.add(queen)
+
+    # Cell numbers to (row, col) pairs
+    def _as_positions(self, cells: set[int]) -> set[tuple[int, int]]:
+        n = self.layout.size
+        return {(cell // n, cell % n) for cell in cells}
+
+'''
+Sessions by token, dropping the least recently used ones past a limit
+max_sessions: most sessions kept in memory
+'''
+class SessionStore:
+    def __init__(self, max_sessions: int = 10000):
+        self._sessions = LRUCache(max_sessions)
+
+    '''
+    Start a session for a region board
+    regions: 2D list of region IDs
+    output: (token, session)
+    '''
+    def create(self, regions: list[list[int]]) -> tuple[str, GameSession]:
+        token = secrets.token_urlsafe(16)
+        session = GameSession(BoardLayout(regions))
+        self._sessions.put(token, session)
+        return token, session
+
+    '''
+    Look up a session
+    output: session, or None if the token is unknown or expired
+    '''
+    def get(self, token: str) -> GameSession | None:
+        return self._sessions.get(token)
@@ -0,0 +1,231 @@
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+import redis
+from redis.exceptions import RedisError
+
+# Pool this one shares its refill logic with
+from pool import PuzzlePool
+# Puzzles are kept in Redis in the compact binary encoding
+from store import encode_puzzle, decode_puzzle
+
+logger = logging.getLogger(__name__)
+
+'''
+Puzzle pool kept in Redis so every server process (uvicorn workers, containers) draws from one stock
+
+Each band is a Redis list of encoded puzzles (store.encode_puzzle, ~60 bytes for a 10 x 10 board):
+    <prefix>:<band>        ready puzzles, pushed on the right and popped from the left
+    <prefix>:<band>:lease  held (SET NX with an expiry) by the one process refilling the band
+'''
+
+# Seconds a Redis command may take before it fails (and the band reads as empty)
+    # Bounds how long a slow or unreachable Redis holds up a request's worker thread
+REDIS_TIMEOUT = 1.0
+
+'''
+Open the Redis client for a URL
+url: redis://, rediss://, or unix:// URL, or memory:// for an in-process LocalRedis
+output: client
+'''
+def connect(url: str):
+    if url.startswith("memory://"):
+        return LocalRedis()
+    return redis.Redis.from_url(url, socket_timeout = REDIS_TIMEOUT, socket_connect_timeout = REDIS_TIMEOUT)
+
+'''
+In-process stand-in for the handful of Redis commands the shared pool uses
+Lets the shared pool (and its lease handling) run without a Redis server: locally, in a
+single process, or in scripts checking several pools against one store.
+'''
+class LocalRedis:
+    def __init__(self):
+        # Key to value (bytes or a deque of bytes) and key to expiry time (time.monotonic)
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            value = self._live(key)
+            return value if isinstance(value, bytes) else None
+
+    def set(self, key: str, value, nx: bool = False, ex: int | None = None) -> bool | None:
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            self._data[key] = _to_bytes(value)
+            self._expires.pop(key, None)
+            if ex is not None:
+                self._expires[key] = time.monotonic() + ex
+            return True
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if self._live(key) is None:
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._live(key) is not None:
+                    del self._data[key]
+                    self._expires.pop(key, None)
+                    removed += 1
+            return removed
+
+    def rpush(self, key: str, *values) -> int:
+        with self._lock:
+            items = self._live(key)
+            if items is None:
+                items = self._data[key] = deque()
+            items.extend(_to_bytes(value) for value in values)
+            return len(items)
+
+    def lpop(self, key: str) -> bytes | None:
+        with self._lock:
+            items = self._live(key)
+            if not items:
+                return None
+            value = items.popleft()
+            # Redis drops a list once it's empty
+            if not items:
+                del self._data[key]
+            return value
+
+    def llen(self, key: str) -> int:
+        with self._lock:
+            items = self._live(key)
+            return len(items) if items is not None else 0
+
+    # Value of a key, dropping it first if it has expired (caller holds the lock)
+    def _live(self, key: str):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            del self._expires[key]
+        return self._data.get(key)
+
+# Redis stores strings and numbers as bytes
+def _to_bytes(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+'''
+PuzzlePool whose ready puzzles live in Redis, shared by every process pointing at the same server
+Every process generates with its own worker processes, but only the one holding a band's lease
+refills it, so N web workers keep one stock at the watermarks rather than N stocks.
+bands, low_watermark, high_watermark, workers, graded, on_generated: as for PuzzlePool
+client: Redis client (redis.Redis or LocalRedis, see connect)
+prefix: key prefix for the band lists and leases
+lease_seconds: how long a refill lease lasts without progress before another process can take over
+'''
+class SharedPuzzlePool(PuzzlePool):
+    def __init__(self, bands: dict[str, tuple[int, int]], client, prefix: str = "queens:pool",
+                 lease_seconds: int = 60, **kwargs):
+        super().__init__(bands, **kwargs)
+        self.client = client
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+
+        # Identifies this process's leases (so it never releases another process's)
+        self._token = uuid.uuid4().hex.encode()
+        # Bands this process holds the refill lease for
+        self._leases = set()
+
+    '''
+    Stop the worker processes and hand back any refill leases straight away
+    '''
+    def stop(self) -> None:
+        super().stop()
+        with self._lock:
+            names, self._leases = self._leases, set()
+        for name in names:
+            self._release(name)
+
+    # Band storage in Redis
+        # Redis being unreachable reads as an empty band, so /generate falls back to inline generation
+    def _pop(self, name: str) -> dict | None:
+        try:
+            data = self.client.lpop(self._key(name))
+        except RedisError as error:
+            logger.warning("Shared pool unavailable: %r", error)
+            return None
+        return decode_puzzle(data) if data is not None else None
+
+    def _push(self, name: str, puzzle: dict) -> None:
+        try:
+            self.client.rpush(self._key(name), encode_puzzle(puzzle))
+        except RedisError as error:
+            logger.warning("Shared pool unavailable, dropping puzzle: %r", error)
+
+    def _count(self, name: str) -> int:
+        try:
+            return self.client.llen(self._key(name))
+        except RedisError:
+            return 0
+
+    # Refill only while holding the band's lease
+    def _top_up(self, name: str) -> None:
+        if self._executor is None or self._count(name) >= self.low_watermark:
+            return
+
+        with self._lock:
+            holding = name in self._leases
+        if not holding:
+            try:
+                acquired = self.client.set(self._lease_key(name), self._token, nx = True, ex = self.lease_seconds)
+            except RedisError:
+                acquired = False
+            # Another process is already refilling this band
+            if not acquired:
+                return
+            with self._lock:
+                self._leases.add(name)
+
+        super()._top_up(name)
+        self._release_if_idle(name)
+
+    # Each finished puzzle extends the lease; the last one releases it
+    def _collect(self, name: str, future) -> None:
+        super()._collect(name, future)
+        if not self._release_if_idle(name):
+            try:
+                self.client.expire(self._lease_key(name), self.lease_seconds)
+            except RedisError:
+                pass
+
+    # Release a band's lease once none of its puzzles are in progress here
+        # Returns whether the band is idle
+    def _release_if_idle(self, name: str) -> bool:
+        with self._lock:
+            if self._pending[name]:
+                return False
+            held = name in self._leases
+            self._leases.discard(name)
+
+        if held:
+            self._release(name)
+        return True
+
+    # Delete a lease if it's still ours (it may have expired and been taken by another process)
+    def _release(self, name: str) -> None:
+        key = self._lease_key(name)
+        try:
+            if self.client.get(key) == self._token:
+                self.client.delete(key)
+        except RedisError:
+            pass
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    def _lease_key(self, name: str) -> str:
+        return f"{self.prefix}:{name}:lease"
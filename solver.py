@@ -0,0 +1,146 @@
+from functools import lru_cache
+
+'''
+Bitboard exact solver for region puzzles
+
+Cells are numbered row * N + col and a set of cells is an int with one bit per cell.
+Every row, column, and region must hold exactly one queen, so each of them is a "unit"
+and the search always branches on the open unit with the fewest legal cells left (dynamic MRV).
+'''
+
+'''
+Attack masks that only depend on the board size
+board_size: size of the square board (N x N)
+output: (row masks, column masks, per-cell mask of its row, column, and both diagonals)
+'''
+@lru_cache(maxsize = None)
+def line_masks(board_size: int) -> tuple[tuple[int, ...], tuple[int, ...], tuple[int, ...]]:
+    n = board_size
+
+    # One mask per row and per column
+    row_masks = tuple(((1 << n) - 1) << (row * n) for row in range(n))
+    col_masks = tuple(sum(1 << (row * n + col) for row in range(n)) for col in range(n))
+
+    # One mask per diagonal in each direction
+        # L -> R diagonals share row + col, R -> L diagonals share row - col
+    diag_lr = [0] * (2 * n - 1)
+    diag_rl = [0] * (2 * n - 1)
+    for row in range(n):
+        for col in range(n):
+            diag_lr[row + col] |= 1 << (row * n + col)
+            diag_rl[row - col + n - 1] |= 1 << (row * n + col)
+
+    # Everything a queen on each cell attacks (including the cell itself)
+    attacks = tuple(
+        row_masks[row] | col_masks[col] | diag_lr[row + col] | diag_rl[row - col + n - 1]
+        for row in range(n)
+        for col in range(n)
+    )
+
+    return row_masks, col_masks, attacks
+
+'''
+Region masks for a region board
+region_board: 2D list of integers where region_board[row][col] = region_id
+output: (region ID of each cell, mask of cells in each region)
+'''
+def region_masks(region_board: list[list[int]]) -> tuple[list[int], list[int]]:
+    n = len(region_board)
+    region_of = [region for row in region_board for region in row]
+
+    masks = [0] * n
+    for cell, region in enumerate(region_of):
+        masks[region] |= 1 << cell
+
+    return region_of, masks
+
+'''
+Find solutions of a region board, stopping once enough are found
+region_board: 2D list of integers where region_board[row][col] = region_id
+limit: stop searching after this many solutions (2 answers "is it unique?")
+fixed: optional (row, col) that must hold a queen (only searches solutions through that cell)
+stats: optional dictionary; "nodes" is incremented by the number of search nodes visited
+output: list of solutions, where each solution maps row to column: solution[row] = column
+'''
+def enumerate_solutions(region_board: list[list[int]], limit: int = 2, fixed: tuple[int, int] | None = None,
+                        stats: dict | None = None) -> list[list[int]]:
+    n = len(region_board)
+    row_masks, col_masks, attacks = line_masks(n)
+    region_of, regions = region_masks(region_board)
+
+    # Each unit (region, row, or column) needs exactly one queen
+    units = regions + list(row_masks) + list(col_masks)
+
+    solutions = []
+    # Cells holding a queen in the current partial assignment
+    placed = []
+    nodes = 0
+
+    # available: mask of cells not attacked yet
+    # open_units: indexes of units that still need a queen
+    def search(available, open_units):
+        nonlocal nodes
+        nodes += 1
+
+        # Every unit filled, so the placement is a solution
+        if not open_units:
+            solution = [0] * n
+            for cell in placed:
+                solution[cell // n] = cell % n
+            solutions.append(solution)
+            return
+
+        # Pick the open unit with the fewest legal cells
+        best_unit = -1
+        best_count = n * n + 1
+        for unit in open_units:
+            count = (units[unit] & available).bit_count()
+            if count < best_count:
+                # Some unit can't be filled anymore, so this branch is dead
+                if count == 0:
+                    return
+                best_unit, best_count = unit, count
+                # Forced move, no need to look further
+                if count == 1:
+                    break
+
+        candidates = units[best_unit] & available
+        while candidates:
+            # Take the lowest set bit
+            low = candidates & -candidates
+            candidates ^= low
+            cell = low.bit_length() - 1
+
+            # Queen blocks its lines and the rest of its region
+            blocked = attacks[cell] | regions[region_of[cell]]
+            # Fills its region, row, and column (all still open, or the cell would be blocked)
+                # Three removals from a copy beat re-testing every open unit against the cell
+            remaining = open_units.copy()
+            remaining.remove(region_of[cell])
+            remaining.remove(n + cell // n)
+            remaining.remove(2 * n + cell % n)
+
+            placed.append(cell)
+            search(available & ~blocked, remaining)
+            placed.pop()
+
+            # Early stopping (enough solutions found)
+            if len(solutions) >= limit:
+                return
+
+    available = (1 << (n * n)) - 1
+    open_units = list(range(len(units)))
+
+    # Start from the forced queen instead of an empty board
+    if fixed is not None:
+        cell = fixed[0] * n + fixed[1]
+        placed.append(cell)
+        available &= ~(attacks[cell] | regions[region_of[cell]])
+        open_units = [unit for unit in open_units if not units[unit] & (1 << cell)]
+
+    search(available, open_units)
+
+    if stats is not None:
+        stats["nodes"] = stats.get("nodes", 0) + nodes
+
+    return solutions
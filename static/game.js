@@ -99,10 +99,14 @@ let gameData,
   dragButton = null,
   lastToggledCell = null,
   // Game winning flag
-  gameWon = false;
+  gameWon = false,
+  // Live game channel (WebSocket); moves go over HTTP while it's closed
+  channel = null,
+  // Queens in conflict as "row,col", kept up to date from the channel's changes
+  channelConflicts = new Set();
 
 // Renders the SVG board
-function draw(conflicts = [])
+function draw(conflicts = [], hinted = [])
 {
   const board = document.getElementById("board");
   // Clear previous board
@@ -128,6 +132,12 @@ function draw(conflicts = [])
           fillColor = "lightcoral";
       }
 
+      // Highlights cells a hint points at
+      else if (hinted.some(([x, y]) => x === i && y === j))
+      {
+          fillColor = "khaki";
+      }
+
       // Draw one <rect> per cell on the board
       const rect = document.createElementNS("http://www.w3.org/2000/svg", "rect");
       rect.setAttribute("x", j * sq);
@@ -218,6 +228,61 @@ async function generate()
   // Draw the board
   draw();
   document.getElementById("status").textContent = "Place one queen in each region.";
+
+  // Moves for this puzzle's session go over the channel from now on
+  openChannel({ token: gameData.token });
+}
+
+// Open a game channel for the current board
+  // start: first message, either { token } or { size, regions, board, notes } for a new session
+function openChannel(start)
+{
+  if (channel) channel.close();
+  channel = null;
+  if (!("WebSocket" in window)) return;
+
+  const scheme = location.protocol === "https:" ? "wss" : "ws";
+  const socket = new WebSocket(`${scheme}://${location.host}/ws/game`);
+  channel = socket;
+
+  socket.onopen = () => socket.send(JSON.stringify(start));
+
+  socket.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    if (message.error)
+    {
+      console.log("Game channel:", message.error);
+      return;
+    }
+
+    // Reply to the first message, so the channel is ready for moves
+    if (message.token !== undefined)
+    {
+      gameData.token = message.token;
+      channelConflicts = new Set(message.conflicts.map(([row, col]) => `${row},${col}`));
+
+      // Show the session's notes, and send any made while the channel was opening
+      const kept = new Set(message.notes.map(([row, col]) => `${row},${col}`));
+      message.notes.forEach(([row, col]) => { if (boardState[row][col] === 0) noteState[row][col] = 1; });
+      noteState.forEach((cells, row) => cells.forEach((note, col) => {
+        if (note && !kept.has(`${row},${col}`)) socket.send(JSON.stringify(["note", row, col]));
+      }));
+      draw();
+
+      socket.ready = true;
+      return;
+    }
+
+    // Only queens whose conflict state changed are sent
+    message.added.forEach(([row, col]) => channelConflicts.add(`${row},${col}`));
+    message.cleared.forEach(([row, col]) => channelConflicts.delete(`${row},${col}`));
+    showResult(message.win, [...channelConflicts].map((key) => key.split(",").map(Number)));
+  };
+
+  // Closed or failed, so later moves fall back to HTTP
+  socket.onclose = () => {
+    if (channel === socket) channel = null;
+  };
 }
 
 // Reset variables when mouse is released
@@ -236,6 +301,9 @@ function toggleQueen(i, j)
   const regionId = gameData.regions[i][j];
   const size = gameData.size;
 
+  // Server-side session gets the move instead of the whole board
+  const move = { row: i, col: j, action: boardState[i][j] === 1 ? "remove" : "place" };
+
   // Queen already in cell, so remove it
   if (boardState[i][j] === 1)
   {
@@ -265,7 +333,7 @@ function toggleQueen(i, j)
   //console.log("boardState before check:", JSON.stringify(boardState));
 
   // Recheck the board for conflicts and winning
-  checkBoard();
+  checkBoard(move);
 }
 
 // Place and remove notes on the board
@@ -279,22 +347,70 @@ function toggleNote(i, j)
   {
     noteState[i][j] ^= 1;
     draw();
+
+    // Keep the server's copy of the notes in step (no reply)
+    sendNote(i, j);
   }
 }
 
-// Check board for conflicts and win condition
-async function checkBoard()
+// Send a cell's note to the game channel as set or cleared (not toggled, so the server can't drift)
+function sendNote(i, j)
+{
+  if (channel && channel.ready) channel.send(JSON.stringify([noteState[i][j] ? "note" : "unnote", i, j]));
+}
+
+// Send one move to the game's server-side session
+  // Returns null if there's no session (or it expired) so the caller can fall back to /check
+async function sendMove(move)
 {
-  // Fetch check from back-end
-  const res = await fetch("/check", {
+  if (!gameData.token || !move) return null;
+
+  const res = await fetch(`/session/${gameData.token}/move`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ size: gameData.size, board: boardState, regions: gameData.regions })
+    body: JSON.stringify(move)
   });
 
-  // Wait for back-end to process the check
-  const { win, conflicts } = await res.json();
+  // Session expired, so stop using it
+  if (res.status === 404)
+  {
+    delete gameData.token;
+    return null;
+  }
+
+  return res.json();
+}
+
+// Check board for conflicts and win condition
+async function checkBoard(move = null)
+{
+  // Channel answers with conflict changes (handled in openChannel)
+  if (move && channel && channel.ready)
+  {
+    channel.send(JSON.stringify([move.action, move.row, move.col]));
+    return;
+  }
 
+  // Session only needs the move
+  let result = await sendMove(move);
+
+  // Otherwise fetch check from back-end with the whole board
+  if (!result)
+  {
+    const res = await fetch("/check", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ size: gameData.size, board: boardState, regions: gameData.regions })
+    });
+    result = await res.json();
+  }
+
+  showResult(result.win, result.conflicts);
+}
+
+// Show the outcome of a move: win message, conflict warnings, and the redrawn board
+function showResult(win, conflicts)
+{
   // Game won
   if (win)
   {
@@ -371,6 +487,36 @@ function euclideanTooFar(conflicts)
   return false;
 }
 
+// Ask the server for the next logical step and point it out
+async function showHint()
+{
+  // Nothing to hint at
+  if (!gameData || gameWon) return;
+
+  const res = await fetch("/hint", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ size: gameData.size, board: boardState, regions: gameData.regions, notes: noteState })
+  });
+  if (!res.ok) return;
+  const hint = await res.json();
+
+  // Ruled-out cells become notes
+  if (hint.action === "eliminate")
+  {
+    for (const [i, j] of hint.cells)
+    {
+      noteState[i][j] = 1;
+      sendNote(i, j);
+    }
+  }
+
+  // Highlight the cells and explain why
+  draw([], hint.cells);
+  const reason = hint.reason.charAt(0).toUpperCase() + hint.reason.slice(1);
+  document.getElementById("status").textContent = hint.action === "place" ? `💡 Queen here: ${reason}.` : `💡 ${reason}.`;
+}
+
 // Show game solution
 function showSolution()
 {
@@ -458,6 +604,9 @@ function load()
   gameWon = false;
   draw();
 
+  // New session on the server for the loaded board
+  openChannel({ size: data.size, regions: data.regions, board: data.board, notes: data.notes });
+
   document.getElementById("status").textContent = "Loaded saved state.";
 }
 
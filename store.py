@@ -0,0 +1,224 @@
+import mmap
+import os
+import random
+import struct
+from array import array
+from collections.abc import Iterator
+
+# Puzzle IDs
+from puzzle_id import encode_puzzle_id, decode_puzzle_id
+# Difficulty names (stored as their position + 1)
+from grading import DIFFICULTIES
+
+'''
+Compact binary puzzle encoding and an append-only on-disk puzzle store
+
+Encoded puzzle (little endian):
+    size (1 byte), difficulty (1 byte, 0 if ungraded), 2 reserved bytes, seed (8 bytes)
+    solution as a permutation, one byte per row (size bytes)
+    region IDs packed 4 bits per cell in row-major order, high nibble first (ceil(size * size / 2) bytes)
+
+Store file:
+    16 byte header: magic, format version, record size, reserved
+    fixed-size records (an encoded puzzle padded to RECORD_SIZE), so record i sits at
+    HEADER_SIZE + i * RECORD_SIZE and can be read straight out of a memory map
+'''
+
+# 4 bits per cell caps region IDs (and so board sizes) at 16
+MAX_SIZE = 16
+
+HEADER = struct.Struct("<4sHH8x")
+MAGIC = b"QPZL"
+VERSION = 1
+HEADER_SIZE = HEADER.size
+
+# size, difficulty, reserved, seed
+PUZZLE_HEADER = struct.Struct("<BB2xQ")
+RECORD_SIZE = PUZZLE_HEADER.size + MAX_SIZE + MAX_SIZE * MAX_SIZE // 2
+
+'''
+Pack a puzzle into bytes
+puzzle: puzzle dictionary with id, size, solution, regions, and optionally difficulty
+output: encoded puzzle (about a quarter of the JSON size for a 10 x 10 board)
+'''
+def encode_puzzle(puzzle: dict) -> bytes:
+    size = puzzle["size"]
+    if not 4 <= size <= MAX_SIZE:
+        raise ValueError(f"only boards up to {MAX_SIZE} x {MAX_SIZE} can be encoded")
+
+    seed, _ = decode_puzzle_id(puzzle["id"])
+    if seed >= 1 << 64:
+        raise ValueError("only seeds below 2 ** 64 can be encoded")
+    cells = [region for row in puzzle["regions"] for region in row]
+    # Odd cell counts get a zero nibble at the end
+    if len(cells) % 2:
+        cells.append(0)
+
+    packed = bytes((cells[i] << 4) | cells[i + 1] for i in range(0, len(cells), 2))
+    difficulty = DIFFICULTIES.index(puzzle["difficulty"]) + 1 if puzzle.get("difficulty") else 0
+    return PUZZLE_HEADER.pack(size, difficulty, seed) + bytes(puzzle["solution"]) + packed
+
+'''
+Unpack a puzzle made by encode_puzzle (trailing padding is ignored)
+data: encoded puzzle or store record
+output: puzzle dictionary with id, size, solution, regions, and difficulty if it was graded
+'''
+def decode_puzzle(data: bytes) -> dict:
+    size, difficulty, seed = PUZZLE_HEADER.unpack_from(data)
+    offset = PUZZLE_HEADER.size
+
+    solution = list(data[offset:offset + size])
+    offset += size
+
+    cells = []
+    for byte in data[offset:offset + (size * size + 1) // 2]:
+        cells.append(byte >> 4)
+        cells.append(byte & 0x0F)
+    regions = [cells[row * size:(row + 1) * size] for row in range(size)]
+
+    puzzle = {"id": encode_puzzle_id(seed, size), "size": size, "solution": solution, "regions": regions}
+    if difficulty:
+        puzzle["difficulty"] = DIFFICULTIES[difficulty - 1]
+    return puzzle
+
+'''
+Append-only file of fixed-size puzzle records, read through a memory map
+path: store file (created with a header if missing)
+'''
+class PuzzleStore:
+    def __init__(self, path: str):
+        self.path = path
+
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as out:
+                out.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE))
+
+        self._file = open(path, "r+b")
+        magic, version, record_size = HEADER.unpack(self._file.read(HEADER_SIZE))
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            self._file.close()
+            raise ValueError(f"{path} is not a version {VERSION} puzzle store")
+
+        self._map = None
+        self._mapped_records = 0
+        # Record numbers for each board size, built on first use
+        self._by_size = None
+
+    '''
+    Add puzzles to the end of the store
+    puzzles: iterable of puzzle dictionaries
+    output: number of puzzles written
+    '''
+    def extend(self, puzzles) -> int:
+        written = 0
+        self._file.seek(0, os.SEEK_END)
+        for puzzle in puzzles:
+            self._file.write(encode_puzzle(puzzle).ljust(RECORD_SIZE, b"\0"))
+            written += 1
+        self._file.flush()
+
+        # Index and map are rebuilt lazily to include the new records
+        self._by_size = None
+        return written
+
+    '''
+    Add one puzzle to the end of the store
+    output: record number of the puzzle
+    '''
+    def append(self, puzzle: dict) -> int:
+        self.extend([puzzle])
+        return len(self) - 1
+
+    def __len__(self) -> int:
+        return (os.fstat(self._file.fileno()).st_size - HEADER_SIZE) // RECORD_SIZE
+
+    '''
+    Raw record bytes (no parsing)
+    index: record number
+    '''
+    def record(self, index: int) -> bytes:
+        if not 0 <= index < len(self):
+            raise IndexError("puzzle store index out of range")
+
+        mapped = self._mapping(index + 1)
+        offset = HEADER_SIZE + index * RECORD_SIZE
+        return mapped[offset:offset + RECORD_SIZE]
+
+    def __getitem__(self, index: int) -> dict:
+        return decode_puzzle(self.record(index))
+
+    '''
+    Pick a random stored puzzle with a board size in a range
+    size_range: (smallest, largest) board size, inclusive
+    rng: random number generator to draw from (defaults to the global random module)
+    output: puzzle dictionary, or None if nothing matches
+    '''
+    def sample(self, size_range: tuple[int, int], rng: random.Random | None = None) -> dict | None:
+        rng = rng or random
+        by_size = self._size_index()
+
+        smallest, largest = size_range
+        matching = [by_size[size] for size in range(smallest, largest + 1) if size in by_size]
+        total = sum(len(records) for records in matching)
+        if total == 0:
+            return None
+
+        # Uniform over every matching record
+        pick = rng.randrange(total)
+        for records in matching:
+            if pick < len(records):
+                return self[records[pick]]
+            pick -= len(records)
+
+    '''
+    Raw records with a board size in a range, in file order
+    Reads straight through the memory map, so memory stays flat however many records match.
+    size_range: (smallest, largest) board size, inclusive
+    output: iterator of record bytes (decode with decode_puzzle)
+    '''
+    def scan(self, size_range: tuple[int, int]) -> Iterator[bytes]:
+        smallest, largest = size_range
+        count = len(self)
+        if count == 0:
+            return
+
+        mapped = self._mapping(count)
+        for index in range(count):
+            offset = HEADER_SIZE + index * RECORD_SIZE
+            # First byte of a record is its board size
+            if smallest <= mapped[offset] <= largest:
+                yield mapped[offset:offset + RECORD_SIZE]
+
+    '''
+    Number of stored puzzles for each board size
+    '''
+    def counts(self) -> dict[int, int]:
+        return {size: len(records) for size, records in self._size_index().items()}
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    # Memory map covering at least the first `records` records
+    def _mapping(self, records: int) -> mmap.mmap:
+        if self._map is None or self._mapped_records < records:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+            self._mapped_records = (len(self._map) - HEADER_SIZE) // RECORD_SIZE
+        return self._map
+
+    # Record numbers grouped by board size (first byte of every record)
+    def _size_index(self) -> dict[int, array]:
+        if self._by_size is None:
+            count = len(self)
+            by_size = {}
+            if count:
+                mapped = self._mapping(count)
+                end = HEADER_SIZE + count * RECORD_SIZE
+                for index, size in enumerate(mapped[HEADER_SIZE:end:RECORD_SIZE]):
+                    by_size.setdefault(size, array("I")).append(index)
+            self._by_size = by_size
+        return self._by_size
@@ -0,0 +1,210 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+# Puzzle IDs (variants carry their symmetry above the seed bits)
+from puzzle_id import encode_puzzle_id, decode_puzzle_id, SEED_BITS
+
+'''
+Symmetries of the square applied to puzzles, canonical forms, and a dedupe index
+
+A square board has 8 symmetries (4 rotations, 4 reflections). Symmetry k is three bits applied in order:
+bit 2 transposes, bit 0 flips top to bottom, bit 1 flips left to right (0 is the identity).
+Rotating or reflecting a puzzle keeps its solution unique (and its difficulty, since every deduction
+turns with the board), so each generated puzzle gives up to 7 more for the cost of copying its cells.
+
+A variant's ID is its base puzzle's seed with the symmetry in the 3 bits above SEED_BITS, so
+generate_puzzle can rebuild any variant from its ID alone.
+'''
+
+SYMMETRIES = 8
+
+'''
+Where a cell ends up under a symmetry
+row, col: cell
+board_size: size of the square board (N x N)
+symmetry: 0-7
+output: (row, col) after the symmetry
+'''
+def transform_cell(row: int, col: int, board_size: int, symmetry: int) -> tuple[int, int]:
+    if symmetry & 4:
+        row, col = col, row
+    if symmetry & 1:
+        row = board_size - 1 - row
+    if symmetry & 2:
+        col = board_size - 1 - col
+    return row, col
+
+# For each symmetry, the source cell of every cell of the transformed board (row-major)
+    # transformed[i] = cells[sources[symmetry][i]]
+@lru_cache(maxsize = None)
+def _sources(board_size: int) -> tuple[tuple[int, ...], ...]:
+    n = board_size
+    tables = []
+    for symmetry in range(SYMMETRIES):
+        sources = [0] * (n * n)
+        for row in range(n):
+            for col in range(n):
+                new_row, new_col = transform_cell(row, col, n, symmetry)
+                sources[new_row * n + new_col] = row * n + col
+        tables.append(tuple(sources))
+    return tuple(tables)
+
+# Symmetry equal to applying first and then second
+@lru_cache(maxsize = None)
+def _compose(first: int, second: int) -> int:
+    # A 3 x 3 board tells all 8 symmetries apart
+    cells = [(row, col) for row in range(3) for col in range(3)]
+    target = [transform_cell(*transform_cell(row, col, 3, first), 3, second) for row, col in cells]
+    for symmetry in range(SYMMETRIES):
+        if [transform_cell(row, col, 3, symmetry) for row, col in cells] == target:
+            return symmetry
+    raise AssertionError("symmetries don't compose")
+
+'''
+Rotate or reflect a region board
+regions: 2D list of region IDs
+symmetry: 0-7
+output: new 2D list (region IDs unchanged)
+'''
+def transform_regions(regions: list[list[int]], symmetry: int) -> list[list[int]]:
+    n = len(regions)
+    cells = [region for row in regions for region in row]
+    moved = [cells[source] for source in _sources(n)[symmetry]]
+    return [moved[row * n:(row + 1) * n] for row in range(n)]
+
+'''
+Rotate or reflect a solution
+solution: column of the queen in each row
+symmetry: 0-7
+output: new solution
+'''
+def transform_solution(solution: list[int], symmetry: int) -> list[int]:
+    n = len(solution)
+    moved = [0] * n
+    for row, col in enumerate(solution):
+        new_row, new_col = transform_cell(row, col, n, symmetry)
+        moved[new_row] = new_col
+    return moved
+
+# Region IDs renumbered in order of first appearance, so any colouring of the same layout matches
+def _relabel(cells) -> bytes:
+    labels = {}
+    return bytes(labels.setdefault(region, len(labels)) for region in cells)
+
+'''
+Form of a region board shared by all 8 of its symmetries and every relabelling of its regions
+regions: 2D list of region IDs
+output: board size followed by the smallest relabelled cell sequence over the symmetries
+'''
+def canonical_form(regions: list[list[int]]) -> bytes:
+    n = len(regions)
+    cells = [region for row in regions for region in row]
+    best = min(_relabel(cells[source] for source in sources) for sources in _sources(n))
+    return bytes([n]) + best
+
+'''
+Short digest of canonical_form (what the dedupe index stores)
+regions: 2D list of region IDs
+output: 16 bytes
+'''
+def canonical_hash(regions: list[list[int]]) -> bytes:
+    return hashlib.blake2b(canonical_form(regions), digest_size = 16).digest()
+
+'''
+Seed of a symmetric variant
+seed: base puzzle's seed (below 2 ** SEED_BITS)
+symmetry: 0-7
+output: seed to put in the variant's ID
+'''
+def variant_seed(seed: int, symmetry: int) -> int:
+    if not 0 <= seed < 1 << SEED_BITS:
+        raise ValueError(f"base seeds must fit in {SEED_BITS} bits")
+    if not 0 <= symmetry < SYMMETRIES:
+        raise ValueError(f"symmetry must be 0-{SYMMETRIES - 1}")
+    return seed | symmetry << SEED_BITS
+
+'''
+Split a seed from an ID into the base seed and symmetry
+seed: seed decoded from a puzzle ID
+output: (base seed, symmetry), symmetry 0 for plain puzzles
+'''
+def split_seed(seed: int) -> tuple[int, int]:
+    symmetry = seed >> SEED_BITS
+    # Larger seeds were never made by variant_seed, so they stay plain seeds
+    if 0 < symmetry < SYMMETRIES:
+        return seed & ((1 << SEED_BITS) - 1), symmetry
+    return seed, 0
+
+'''
+Rotate or reflect a whole puzzle (regions, solution, and ID)
+puzzle: puzzle dictionary (itself possibly a variant)
+symmetry: 0-7
+output: new puzzle dictionary, other keys (e.g. difficulty) copied over
+'''
+def transform_puzzle(puzzle: dict, symmetry: int) -> dict:
+    seed, size = decode_puzzle_id(puzzle["id"])
+    base, applied = split_seed(seed)
+
+    variant = dict(puzzle)
+    variant["id"] = encode_puzzle_id(variant_seed(base, _compose(applied, symmetry)), size)
+    variant["regions"] = transform_regions(puzzle["regions"], symmetry)
+    variant["solution"] = transform_solution(puzzle["solution"], symmetry)
+    return variant
+
+'''
+Every distinct rotation and reflection of a puzzle
+Symmetric boards give fewer than 8 (copies that only differ by region IDs are skipped).
+puzzle: puzzle dictionary
+output: list of puzzle dictionaries, starting with the puzzle itself
+'''
+def puzzle_variants(puzzle: dict) -> list[dict]:
+    n = puzzle["size"]
+    cells = [region for row in puzzle["regions"] for region in row]
+
+    variants = []
+    seen = set()
+    for symmetry, sources in enumerate(_sources(n)):
+        form = _relabel(cells[source] for source in sources)
+        if form in seen:
+            continue
+        seen.add(form)
+        variants.append(puzzle if symmetry == 0 else transform_puzzle(puzzle, symmetry))
+    return variants
+
+'''
+Canonical hashes of puzzles seen so far, catching repeats in any orientation or colouring
+max_entries: least recently seen hashes are forgotten past this many (None keeps them all)
+'''
+class DedupeIndex:
+    def __init__(self, max_entries: int | None = None):
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+        # Pool callbacks and request handlers may add at the same time
+        self._lock = threading.Lock()
+
+    '''
+    Record a region board
+    regions: 2D list of region IDs
+    output: True if it's new, False if it (or a symmetry of it) was already seen
+    '''
+    def add(self, regions: list[list[int]]) -> bool:
+        key = canonical_hash(regions)
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                return False
+
+            self._seen[key] = None
+            if self.max_entries is not None and len(self._seen) > self.max_entries:
+                self._seen.popitem(last = False)
+            return True
+
+    def __contains__(self, regions: list[list[int]]) -> bool:
+        key = canonical_hash(regions)
+        with self._lock:
+            return key in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
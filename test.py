@@ -1,76 +1,168 @@
+import argparse
 import random
-from itertools import product
+import sys
 
 # Import core functions from your queenPuzzle module
 from logic import *
+from solver import enumerate_solutions
 
-# Brute force a puzzle
-def brute_force_solutions(regions, size):
-    # Dictionary mapping region ID to a list of board cells (row, col) in that region
-    region_cells = {r: [] for r in range(size)}
-    for row in range(size):
-        for col in range(size):
-            # List of lists corresponding to board colors
-            region_cells[regions[row][col]].append((row, col))
-
-    valid_solutions = []
-    # Iterate over all combinations (one cell per region)
-    for placement in product(*(region_cells[r] for r in range(size))):
-        # Check queen-attack constraint
-        ok = True
-        for a in range(size):
-            for b in range(a + 1, size):
-                r1, c1 = placement[a]
-                r2, c2 = placement[b]
-                # See if queens can attack
-                if queens_attack(r1, c1, r2, c2):
-                    ok = False
-                    break
-            if not ok:
-                break
-        
-        # Solution is valid
-        if ok:
-            valid_solutions.append(placement)
-
-    return valid_solutions
-
-def main(rand_one = 4, rand_two = 8):
-    # Loop through 1000 puzzles and brute force their solutions
-        # Ensure puzzle generation only outputs puzzles with one answer
-    total_unique = 0
-    for i in range(500):
-        while True:
-            # Number of queens in puzzle
-            size = random.randint(rand_one, rand_two)
+'''
+Count solutions with Algorithm X (exact cover), independent of the solver in logic.py
+Every row, column, and region must be covered exactly once (primary constraints),
+and every diagonal at most once (secondary constraints)
+Runs on dancing links: constraints and placements are circular doubly linked lists held in flat arrays,
+and each constraint keeps a live count of its placements, so covering and uncovering cost only the
+links they touch and picking the tightest constraint never rebuilds anything.
+regions: 2D list of region IDs
+size: size of the square board (N x N)
+output: number of valid placements
+'''
+def count_solutions_exact_cover(regions, size):
+    n = size
+    # Columns 1..3n are primary (rows, columns, regions), then the 2 * (2n - 1) diagonals are secondary
+    primary = 3 * n
+    columns = primary + 2 * (2 * n - 1)
+
+    # Node 0 is the root and nodes 1..columns the column headers; placements add 5 nodes each
+    left = list(range(columns + 1))
+    right = list(range(columns + 1))
+    up = list(range(columns + 1))
+    down = list(range(columns + 1))
+    column = list(range(columns + 1))
+    # Placements still able to cover each column
+    count = [0] * (columns + 1)
+
+    # Only primary columns are in the root's ring (secondary ones link to themselves)
+    for col in range(primary + 1):
+        left[col] = col - 1 if col else primary
+        right[col] = col + 1 if col < primary else 0
 
-            # Generate queen placement
-            solution = generate_queen_solution(size)
+    for row in range(n):
+        for col in range(n):
+            constraints = (1 + row, 1 + n + col, 1 + 2 * n + regions[row][col],
+                           1 + primary + row + col, 1 + primary + 2 * n - 1 + row - col + n - 1)
+            first = len(left)
+            for offset, header in enumerate(constraints):
+                node = first + offset
+                # Ring of this placement's nodes
+                left.append(node - 1 if offset else first + 4)
+                right.append(node + 1 if offset < 4 else first)
+                # Append to the bottom of the column
+                up.append(up[header])
+                down.append(header)
+                down[up[header]] = node
+                up[header] = node
+                column.append(header)
+                count[header] += 1
 
-            # Generate regions around queens
-            regions = generate_regions(solution, size)
+    # Take a column out of the root ring and hide every placement that covers it
+    def cover(col):
+        right[left[col]] = right[col]
+        left[right[col]] = left[col]
+        i = down[col]
+        while i != col:
+            j = right[i]
+            while j != i:
+                up[down[j]] = up[j]
+                down[up[j]] = down[j]
+                count[column[j]] -= 1
+                j = right[j]
+            i = down[i]
 
-            # Carve regions for uniqueness
-            carved_regions = carve_regions(solution, regions)
+    # Exact reverse of cover
+    def uncover(col):
+        i = up[col]
+        while i != col:
+            j = left[i]
+            while j != i:
+                count[column[j]] += 1
+                up[down[j]] = j
+                down[up[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[col]] = col
+        left[right[col]] = col
 
-            # Verify that there's only one valid solution
-            if len(find_queen_solutions(carved_regions)) < 2:
-                regions = carved_regions
-                break
+    def search():
+        # Every primary constraint covered
+        col = right[0]
+        if col == 0:
+            return 1
 
-            # Regenerate if more solutions
-            print(f"Regenerating puzzle")
+        # Primary constraint with the fewest placements left (one left is forced, so stop looking)
+        best = col
+        least = count[col]
+        while col != 0 and least > 1:
+            if count[col] < least:
+                best, least = col, count[col]
+            col = right[col]
+        if least == 0:
+            return 0
 
-        # Brute force to verify only one solution
-        sols = brute_force_solutions(carved_regions, size)
-        count = len(sols)
-        # Increment total unique
-        if count == 1:
+        total = 0
+        cover(best)
+        i = down[best]
+        while i != best:
+            # Place the queen: cover the rest of its constraints
+            j = right[i]
+            while j != i:
+                cover(column[j])
+                j = right[j]
+            total += search()
+            j = left[i]
+            while j != i:
+                uncover(column[j])
+                j = left[j]
+            i = down[i]
+        uncover(best)
+        return total
+
+    return search()
+
+'''
+Cross-check the generator and solver against the exact-cover counter on seeded puzzles
+count: number of puzzles to generate
+rand_one, rand_two: board size range
+seed: base seed (puzzle i uses seed + i)
+'''
+def main(count = 500, rand_one = 4, rand_two = 8, seed = 0):
+    rng = random.Random(seed)
+    total_unique = 0
+    mismatches = 0
+
+    for i in range(count):
+        # Number of queens in puzzle
+        size = rng.randint(rand_one, rand_two)
+
+        # Generated puzzle must have exactly one solution
+        puzzle = generate_puzzle(size, seed = seed + i)
+        count_found = count_solutions_exact_cover(puzzle["regions"], size)
+        if count_found == 1:
             total_unique += 1
-        
-        print(f"\ntest {i}: Generated {size}*{size} puzzle, found {count} valid placement(s).")
-    
-    print(f"\n\n{total_unique} unique solutions")
+
+        # Solver must agree with the counter on an uncarved board too
+            # Uncarved boards usually have several solutions
+        solution = generate_queen_solution(size, rng)
+        regions = generate_regions(solution, size, rng)
+        expected = count_solutions_exact_cover(regions, size)
+        found = len(enumerate_solutions(regions, limit = expected + 1))
+        unique_check = len(find_queen_solutions(regions))
+        if found != expected or unique_check != min(expected, 2):
+            mismatches += 1
+            print(f"test {i}: solver found {found} solution(s), exact cover found {expected}: {regions}")
+
+        print(f"test {i}: Generated {size}*{size} puzzle, found {count_found} valid placement(s).")
+
+    print(f"\n\n{total_unique}/{count} unique solutions, {mismatches} solver mismatch(es)")
+    return total_unique == count and mismatches == 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description = "Cross-check puzzle generation and the solver against an exact-cover counter")
+    parser.add_argument("--puzzles", type = int, default = 500, help = "number of puzzles")
+    parser.add_argument("--min-size", type = int, default = 4, help = "smallest board size")
+    parser.add_argument("--max-size", type = int, default = 8, help = "largest board size")
+    parser.add_argument("--seed", type = int, default = 0, help = "base seed")
+    args = parser.parse_args()
+    # Non-zero exit so CI fails on a non-unique puzzle or a solver disagreement
+    if not main(args.puzzles, args.min_size, args.max_size, args.seed):
+        sys.exit(1)
@@ -0,0 +1,258 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+from checker import check_board
+from connectivity import RegionIndex, neighbor_cells
+from grading import DIFFICULTIES
+from puzzle_id import encode_puzzle_id
+from logic import generate_queen_solution, generate_regions, generate_puzzle, is_region_connected
+from pool import PuzzlePool
+from sessions import BoardLayout, GameSession
+from shared_pool import LocalRedis, SharedPuzzlePool
+from symmetry import canonical_form, puzzle_variants
+from store import PuzzleStore, encode_puzzle, decode_puzzle
+
+'''
+Fuzz the incremental structures against the straightforward code they replace
+Each check replays seeded random operations and compares every step with a full recomputation,
+so a bookkeeping slip shows up as the first case and step that disagree.
+'''
+
+'''
+Replay random place/remove moves on a GameSession and check each state with check_board
+cases: number of random boards
+moves: moves per board
+rng: random source
+output: number of mismatches
+'''
+def fuzz_sessions(cases, moves, rng):
+    mismatches = 0
+
+    for case in range(cases):
+        size = rng.randint(4, 10)
+        solution = generate_queen_solution(size, rng)
+        regions = generate_regions(solution, size, rng)
+        session = GameSession(BoardLayout(regions))
+        board = [[0] * size for _ in range(size)]
+        # Queen cell in each region, mirroring the one-queen-per-region rule
+        queen_in_region = {}
+
+        for step in range(moves):
+            row, col = rng.randrange(size), rng.randrange(size)
+            region = regions[row][col]
+
+            # Mostly placements so boards fill up and reach wins
+            if rng.random() < 0.7:
+                session.place(row, col)
+                previous = queen_in_region.get(region)
+                if previous is not None:
+                    board[previous[0]][previous[1]] = 0
+                queen_in_region[region] = (row, col)
+                board[row][col] = 1
+            else:
+                session.remove(row, col)
+                if queen_in_region.get(region) == (row, col):
+                    del queen_in_region[region]
+                    board[row][col] = 0
+
+            win, conflicts = check_board(board, regions)
+            if session.conflicts() != conflicts or session.win != win:
+                mismatches += 1
+                print(f"session case {case} step {step}: session has {session.conflicts()} (win {session.win}), "
+                      f"check_board has {conflicts} (win {win}) on {regions}")
+                break
+
+        # The solution itself must always read as a win
+        for row, col in enumerate(solution):
+            session.place(row, col)
+        if not session.win or session.conflicts():
+            mismatches += 1
+            print(f"session case {case}: solution {solution} is not a win on {regions}")
+
+    return mismatches
+
+'''
+Move random border cells between regions (keeping each region connected) and check every can_leave against is_region_connected
+cases: number of random boards
+moves: cell moves per board
+rng: random source
+output: number of mismatches
+'''
+def fuzz_region_index(cases, moves, rng):
+    mismatches = 0
+
+    for case in range(cases):
+        size = rng.randint(4, 10)
+        solution = generate_queen_solution(size, rng)
+        regions = generate_regions(solution, size, rng)
+        index = RegionIndex(regions)
+        neighbors = neighbor_cells(size)
+
+        for step in range(moves + 1):
+            # Every cell agrees before each move (and after the last one)
+            disagreement = next(
+                ((cell, expected) for cell in range(size * size)
+                 if index.can_leave(cell // size, cell % size) !=
+                    (expected := is_region_connected(regions, regions[cell // size][cell % size], divmod(cell, size)))),
+                None,
+            )
+            if disagreement:
+                (cell, expected) = disagreement
+                mismatches += 1
+                print(f"region case {case} step {step}: can_leave{divmod(cell, size)} is {not expected}, "
+                      f"is_region_connected is {expected} on {regions}")
+                break
+
+            # Move a random cell into a neighbouring region, like carving does
+                # Only cells the reference says can leave, so regions never split
+                # (the index treats a split region as frozen, the DFS only looks at what's left)
+            cell = rng.randrange(size * size)
+            row, col = divmod(cell, size)
+            targets = [regions[other // size][other % size] for other in neighbors[cell]
+                       if regions[other // size][other % size] != regions[row][col]]
+            if targets and is_region_connected(regions, regions[row][col], (row, col)):
+                region = rng.choice(targets)
+                regions[row][col] = region
+                index.move(row, col, region)
+
+    return mismatches
+
+'''
+Round-trip puzzles through encode/decode and a PuzzleStore file
+cases: number of puzzles
+rng: random source
+output: number of mismatches
+'''
+def round_trip_store(cases, rng):
+    mismatches = 0
+    puzzles = []
+
+    for case in range(cases):
+        size = rng.randint(4, 16)
+        # Generated puzzles for small boards, uncarved boards up to the 16 x 16 limit
+        if size <= 8:
+            puzzle = generate_puzzle(size, seed = rng.getrandbits(48))
+        else:
+            solution = generate_queen_solution(size, rng)
+            puzzle = {"id": encode_puzzle_id(rng.getrandbits(48), size), "size": size, "solution": solution,
+                      "regions": generate_regions(solution, size, rng)}
+        if rng.random() < 0.5:
+            puzzle["difficulty"] = rng.choice(DIFFICULTIES)
+        puzzles.append(puzzle)
+
+        decoded = decode_puzzle(encode_puzzle(puzzle))
+        if decoded != puzzle:
+            mismatches += 1
+            print(f"store case {case}: {puzzle} decoded as {decoded}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "puzzles.qpz")
+        store = PuzzleStore(path)
+        store.extend(puzzles[:cases // 2])
+        for puzzle in puzzles[cases // 2:]:
+            store.append(puzzle)
+        store.close()
+
+        # Reopened store must give back every puzzle in order
+        store = PuzzleStore(path)
+        if len(store) != len(puzzles):
+            mismatches += 1
+            print(f"store holds {len(store)} puzzles, wrote {len(puzzles)}")
+        for i, puzzle in enumerate(puzzles[:len(store)]):
+            if store[i] != puzzle:
+                mismatches += 1
+                print(f"store record {i}: {puzzle} read back as {store[i]}")
+
+        # Scans and counts cover each size exactly once
+        for size in range(4, 17):
+            expected = [puzzle for puzzle in puzzles if puzzle["size"] == size]
+            scanned = [decode_puzzle(record) for record in store.scan((size, size))]
+            if scanned != expected or store.counts().get(size, 0) != len(expected):
+                mismatches += 1
+                print(f"store scan of {size} x {size} returned {len(scanned)} puzzles, expected {len(expected)}")
+        store.close()
+
+    return mismatches
+
+'''
+Feed generations with all their variants into a pool and check no two puzzles in a row share a canonical form
+Runs on the in-process pool and the shared pool (over LocalRedis), popping a random number between generations.
+cases: number of generations
+rng: random source
+output: number of mismatches
+'''
+def interleave_variants(cases, rng):
+    mismatches = 0
+
+    for pool in (PuzzlePool({"band": (6, 8)}, variants = True),
+                 SharedPuzzlePool({"band": (6, 8)}, LocalRedis(), variants = True)):
+        kind = type(pool).__name__
+        # Canonical forms already fed in, so two generations are never the same puzzle
+        seen = set()
+        stored = 0
+        popped = []
+
+        for case in range(cases):
+            puzzle = generate_puzzle(rng.randint(6, 8), seed = rng.getrandbits(48))
+            if canonical_form(puzzle["regions"]) in seen:
+                continue
+            seen.add(canonical_form(puzzle["regions"]))
+            variants = puzzle_variants(puzzle)
+            stored += len(variants)
+            pool._store("band", variants)
+
+            for _ in range(rng.randint(0, 12)):
+                puzzle = pool.get("band")
+                if puzzle is not None:
+                    popped.append(canonical_form(puzzle["regions"]))
+        while (puzzle := pool.get("band")) is not None:
+            popped.append(canonical_form(puzzle["regions"]))
+
+        repeats = sum(first == second for first, second in zip(popped, popped[1:]))
+        if repeats:
+            mismatches += repeats
+            print(f"{kind}: {repeats} pair(s) of variants handed out back to back")
+
+        # Nothing lost: what wasn't handed out is still held for the next generation
+        held = sum(len(family) for family in pool._held["band"])
+        if len(popped) + held != stored:
+            mismatches += 1
+            print(f"{kind}: stored {stored} puzzles, handed out {len(popped)} and held {held}")
+
+    return mismatches
+
+'''
+Run every fuzz check
+cases: random boards (or puzzles) per check
+moves: operations per board
+seed: random seed
+output: True if nothing disagreed
+'''
+def main(cases = 200, moves = 60, seed = 0):
+    checks = [
+        ("sessions vs check_board", lambda rng: fuzz_sessions(cases, moves, rng)),
+        ("RegionIndex vs is_region_connected", lambda rng: fuzz_region_index(cases, moves, rng)),
+        ("store round trip", lambda rng: round_trip_store(cases, rng)),
+        ("pool variants interleaved", lambda rng: interleave_variants(cases, rng)),
+    ]
+
+    failed = 0
+    for name, check in checks:
+        mismatches = check(random.Random(seed))
+        print(f"{name}: {mismatches} mismatch(es)")
+        failed += mismatches
+
+    return failed == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Fuzz game sessions, the region index, and the puzzle store against reference code")
+    parser.add_argument("--cases", type = int, default = 200, help = "random boards per check")
+    parser.add_argument("--moves", type = int, default = 60, help = "moves per board")
+    parser.add_argument("--seed", type = int, default = 0, help = "random seed")
+    args = parser.parse_args()
+    # Non-zero exit so CI fails on any disagreement
+    if not main(args.cases, args.moves, args.seed):
+        sys.exit(1)
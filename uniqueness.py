@@ -0,0 +1,76 @@
+# Bitboard exact solver
+from solver import enumerate_solutions
+
+'''
+Keeps track of a region board's alternate solutions while it is being carved
+
+Moving one cell between regions only changes solutions that put a queen on that cell:
+every other solution still has one queen per region. So after a move, the known alternates
+that used the cell are dropped and only the subtree "queen on the moved cell" is searched again.
+A full search is only needed when the known alternates run out and the list wasn't complete.
+
+target_solution: the solution the puzzle should keep (list of column positions)
+region_board: 2D grid of region IDs, changed through reassign()
+cache_size: most alternates remembered from one search
+stats: optional dictionary; solver "nodes", "full_searches", and "cell_searches" are incremented
+'''
+class UniquenessTracker:
+    def __init__(self, target_solution: list[int], region_board: list[list[int]], cache_size: int = 32,
+                 stats: dict | None = None):
+        self.target_solution = target_solution
+        self.region_board = region_board
+        self.cache_size = cache_size
+        self.stats = stats
+
+        # Alternate solutions known to be valid on the current board
+        self._alternates = []
+        # True when _alternates holds every alternate solution
+        self._complete = False
+
+        # Number of whole-board and single-cell searches (for benchmarks)
+        self.full_searches = 0
+        self.cell_searches = 0
+
+    '''
+    An alternate solution of the current board
+    output: solution other than the target, or None if the target is the only one
+    '''
+    def alternate(self) -> list[int] | None:
+        # Known alternates ran out, but there may be more we never listed
+        if not self._alternates and not self._complete:
+            self._alternates, self._complete = self._search()
+            self.full_searches += 1
+
+        return self._alternates[0] if self._alternates else None
+
+    '''
+    Move one cell into another region
+    row, col: cell to move
+    region_id: region the cell joins
+    '''
+    def reassign(self, row: int, col: int, region_id: int) -> None:
+        self.region_board[row][col] = region_id
+
+        # Solutions with a queen on the moved cell lost it from their region
+        self._alternates = [sol for sol in self._alternates if sol[row] != col]
+
+        # Complete list stays complete by adding solutions through the moved cell
+            # A partial list only needs to be redone once it's empty
+        if self._complete:
+            found, complete = self._search(fixed = (row, col))
+            self._alternates.extend(found)
+            self._complete = complete
+            self.cell_searches += 1
+
+    # Search the current board, optionally only through one cell
+        # Returns (alternates found, whether that's every alternate)
+    def _search(self, fixed = None):
+        solutions = enumerate_solutions(self.region_board, limit = self.cache_size + 1, fixed = fixed,
+                                        stats = self.stats)
+        alternates = [sol for sol in solutions if sol != self.target_solution]
+
+        if self.stats is not None:
+            key = "full_searches" if fixed is None else "cell_searches"
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+        return alternates, len(solutions) <= self.cache_size